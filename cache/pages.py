@@ -0,0 +1,110 @@
+"""
+A read-through Redis cache for the data shown on summoner pages (see summoners.views.show).
+
+Each component of a page (the summoner, their league entry and their recent matches)
+is cached separately, with its own TTL (see SingleSummoner.page_data), so a hot page
+can be served without touching the database. The store tasks invalidate the
+components they change, so a page never waits on a TTL to show new data.
+"""
+
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from utils.functions import standardize_name
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SUMMONER = 'summoner'
+LEAGUE_ENTRY = 'league_entry'
+RECENT_MATCHES = 'recent_matches'
+
+
+def summoner_key(summoner_id=None, std_name=None):
+    """
+    Returns the key of a summoner, by ID if one is given, else by standardized name.
+    """
+    if summoner_id is not None:
+        return 'id:{}'.format(summoner_id)
+    else:
+        return 'name:{}'.format(std_name)
+
+
+class SummonerPageCache:
+    def __init__(self, client=None, prefix='page:summoner'):
+        self.client = client if client is not None else get_redis()
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, component, region, key):
+        return '{}:{}:{}:{}'.format(self.prefix, component, region.lower(), key)
+
+    def get_or_set(self, component, region, key, ttl, load, cache_none=True):
+        """
+        Returns the cached value of a page component, or the value returned by
+        `load`, which is cached for `ttl` (a timedelta).
+
+        Values must be JSON serializable. If `cache_none` is False, a None value
+        isn't cached, so `load` is called again next time.
+        """
+        cache_key = self._key(component, region, key)
+        cached = self.client.get(cache_key)
+
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached.decode())
+
+        self.misses += 1
+        value = load()
+
+        if value is not None or cache_none:
+            self.client.set(cache_key, json.dumps(value, cls=DjangoJSONEncoder),
+                            ex=int(ttl.total_seconds()))
+
+        return value
+
+    def invalidate(self, component, region, keys):
+        """
+        Removes the given keys (see summoner_key) of a component of `region`.
+        """
+        cache_keys = [self._key(component, region, key) for key in keys]
+
+        if cache_keys:
+            self.client.delete(*cache_keys)
+            logger.debug('Invalidated %s %s entries for %s', len(cache_keys), component, region)
+
+    def invalidate_summoners(self, region, summoners):
+        """
+        Accepts Riot's Summoner DTOs, e.g. a get_summoners response's values.
+        """
+        keys = []
+
+        for attrs in summoners:
+            keys.append(summoner_key(summoner_id=attrs['id']))
+            keys.append(summoner_key(std_name=standardize_name(attrs['name'])))
+
+        self.invalidate(SUMMONER, region, keys)
+
+    def invalidate_league_entries(self, region, league):
+        """
+        Accepts Riot's League DTO, every entry of which may have changed.
+        """
+        self.invalidate(LEAGUE_ENTRY, region,
+                        [summoner_key(summoner_id=entry['playerOrTeamId'])
+                         for entry in league.get('entries', [])])
+
+    def invalidate_recent_matches(self, matches):
+        """
+        Accepts Riot's MatchDetail DTOs, the players of which have a new recent match.
+        """
+        for match in matches:
+            self.invalidate(RECENT_MATCHES, match['region'],
+                            [summoner_key(summoner_id=pi['player']['summonerId'])
+                             for pi in match.get('participantIdentities', [])
+                             if 'player' in pi])
+
+
+page_cache = SummonerPageCache()
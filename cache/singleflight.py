@@ -0,0 +1,110 @@
+"""
+Single-flight coalescing of summoner queries, shared by all web processes through Redis.
+
+When several users open the page of the same summoner at once, each would start its
+own full query (match list, league) and spend the shared rate budget on the same
+data. Instead, the first caller registers the IDs of the tasks it starts, and callers
+that come while they are running get those IDs to wait on.
+"""
+
+import json
+import logging
+import time
+
+from celery.result import AsyncResult
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# An upper bound on how long a query's tasks are waited on by other callers, in case
+# their results are lost.
+QUERY_TTL = 5 * 60
+
+# How long the first caller has to start its tasks, and how long others wait for it.
+START_TTL = 10
+START_WAIT = 2
+START_POLL_INTERVAL = .05
+
+# Replaces the value of KEYS[1] with ARGV[2] (for ARGV[3] sec) if it is still ARGV[1]
+# (or doesn't exist, if ARGV[1] is empty). Returns 1 if it was replaced, else 0.
+_REPLACE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+
+if (current == false and ARGV[1] == '') or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+    return 1
+end
+
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Accepts the TTL of registered task IDs, see QUERY_TTL.
+    """
+    def __init__(self, client=None, prefix='singleflight:summoner', ttl=QUERY_TTL):
+        self.client = client if client is not None else get_redis()
+        self.prefix = prefix
+        self.ttl = ttl
+        self._replace = self.client.register_script(_REPLACE_SCRIPT)
+
+    def _key(self, region, key):
+        return '{}:{}:{}'.format(self.prefix, region.lower(), key)
+
+    @staticmethod
+    def _is_running(task_ids):
+        return any(not AsyncResult(task_id).ready() for task_id in task_ids)
+
+    def run(self, region, key, start):
+        """
+        Calls `start`, which starts a query's tasks and returns their IDs, unless a
+        query for the same `region` and `key` (e.g. a summoner ID or standardized name)
+        is already running, in which case its task IDs are returned instead.
+        """
+        name = self._key(region, key)
+        current = self.client.get(name)
+        current = current.decode() if current is not None else ''
+
+        if current.startswith('['):
+            task_ids = json.loads(current)
+
+            if self._is_running(task_ids):
+                logger.debug('Attaching to running query %s: %s', name, task_ids)
+                return task_ids
+
+        # A unique marker that tells others that the tasks are being started.
+        marker = 'starting:{}:{}'.format(id(self), time.time())
+
+        if self._replace(keys=[name], args=[current, marker, START_TTL]):
+            task_ids = start()
+            self.client.set(name, json.dumps(task_ids), ex=self.ttl)
+            return task_ids
+
+        task_ids = self._wait_for_start(name)
+
+        if task_ids is None:
+            # Whoever is starting them is taking too long, don't keep the user waiting.
+            logger.warning('Timed out waiting on query %s to start', name)
+            return start()
+
+        logger.debug('Attaching to started query %s: %s', name, task_ids)
+        return task_ids
+
+    def _wait_for_start(self, name):
+        """
+        Returns the task IDs registered at `name` once they are, or None if that
+        doesn't happen within START_WAIT sec.
+        """
+        deadline = time.time() + START_WAIT
+
+        while time.time() < deadline:
+            current = self.client.get(name)
+
+            if current is not None and current.startswith(b'['):
+                return json.loads(current.decode())
+
+            time.sleep(START_POLL_INTERVAL)
+
+        return None
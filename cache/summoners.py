@@ -6,16 +6,23 @@ import logging
 from datetime import datetime, timedelta
 
 import pytz
+from celery.result import AsyncResult
 from django.db import transaction
 
+from lol_stats2.celery import app
 from summoners.models import Summoner, InvalidSummonerQuery
 from leagues.models import LeagueEntry
+from cache.pages import page_cache, summoner_key, SUMMONER, LEAGUE_ENTRY, RECENT_MATCHES
+from cache.singleflight import SingleFlight
+from riot_api.routing import INTERACTIVE
 from riot_api.wrapper import RiotAPI
 from utils.functions import coalesce_task_ids, standardize_name
 from utils.constants import REGIONS
 
 logger = logging.getLogger(__name__)
 
+query_flights = SingleFlight()
+
 
 class SingleSummoner:
     """
@@ -32,11 +39,15 @@ class SingleSummoner:
     If it is known, the page can be loaded w/whatever data we have on them
     and flow control leaves this class.
 
-    If they are not known, then we have to call first_time_query.
+    If they are not known, then we have to call start_first_time_query (or
+    first_time_query, which blocks until everything is fetched).
 
     Additionally, a partial query can be performed by the user which refreshes
     data using the region passed to __init__, but uses the summoner ID since
     that will always refer to the same account.
+
+    Since a user is waiting on them, all Riot API calls are made with INTERACTIVE
+    priority (see riot_api.routing).
     """
     _SUMMONER_UPDATE_INTERVAL = timedelta(minutes=15)
     _MATCH_HISTORY_UPDATE_INTERVAL = timedelta(minutes=15)
@@ -91,7 +102,8 @@ class SingleSummoner:
     def first_time_query(self):
         """
         Synchronous query of Riot API for summoner that isn't known.
-        All tasks must finish before summoner detail page load.
+        All tasks finish before this returns, so it's meant for console use; pages use
+        start_first_time_query instead.
 
         If a 404 response is returned, the "Summoner not found" page should be shown.
         Else follow up with a full query of everything else and load summoner detail page.
@@ -102,7 +114,47 @@ class SingleSummoner:
         query_start = datetime.now()
         result = self._query_summoner_by_name().get()
 
+        if self.handle_lookup_result(result):
+            self.get_instance().set_last_full_update()
+            self.blocking_full_query()
+
+            logger.info('complete: found summoner and got data ({})'.format(datetime.now() - query_start))
+            return True
+        else:
+            logger.info('complete: did not find summoner ({})'.format(datetime.now() - query_start))
+            return False
+
+    def start_first_time_query(self):
+        """
+        Asynchronous query of Riot API for summoner that isn't known.
 
+        Starts the summoner lookup, followed by finish_first_time_query, which runs a
+        full query if the summoner was found (or blacklists the query if not).
+
+        If the summoner is already being looked up (e.g. by another user), returns
+        the task IDs of that lookup instead of starting another.
+
+        Returns the task IDs to wait on, see cache.views.task_status.
+        """
+        def start():
+            logger.info('started on [{}] {}'.format(self.region, self.std_name))
+
+            lookup = RiotAPI.get_summoners(names=self.std_name, region=self.region,
+                                           priority=INTERACTIVE,
+                                           callback=finish_first_time_query.s(self.std_name,
+                                                                              self.region))
+
+            return coalesce_task_ids([lookup])
+
+        return query_flights.run(self.region, 'name:{}'.format(self.std_name), start)
+
+    def handle_lookup_result(self, result):
+        """
+        Accepts the result of store_summoners for a lookup by name.
+
+        Returns True if the summoner was found, otherwise False. Queries of summoners
+        that don't exist are blacklisted.
+        """
         if result['created'] == 0 and result['updated'] == 0:
             blacklisted = InvalidSummonerQuery(name=self.std_name, region=self.region)
             blacklisted.save()
@@ -111,15 +163,7 @@ class SingleSummoner:
 
         # TODO: result['updated'] should never equal 1 since this is a first-time query?
         # Investigate potential for race condition.
-        if result['created'] == 1 or result['updated'] == 1:
-            self.get_instance().set_last_full_update()
-            self.blocking_full_query()
-
-            logger.info('complete: found summoner and got data ({})'.format(datetime.now() - query_start))
-            return True
-        else:
-            logger.info('complete: did not find summoner ({})'.format(datetime.now() - query_start))
-            return False
+        return result['created'] == 1 or result['updated'] == 1
 
     def is_known(self):
         """
@@ -139,10 +183,10 @@ class SingleSummoner:
         return InvalidSummonerQuery.objects.contains(name=self.std_name, region=self.region)
 
     def _query_summoner_by_name(self):
-        return RiotAPI.get_summoners(names=self.std_name, region=self.region)
+        return RiotAPI.get_summoners(names=self.std_name, region=self.region, priority=INTERACTIVE)
 
     def _query_summoner_by_id(self):
-        return RiotAPI.get_summoners(ids=self.summoner_id, region=self.region)
+        return RiotAPI.get_summoners(ids=self.summoner_id, region=self.region, priority=INTERACTIVE)
 
     def get_instance(self):
         """
@@ -166,12 +210,72 @@ class SingleSummoner:
 
         return self.summoner
 
+    def page_data(self):
+        """
+        Returns a dict of the data shown on the summoner's page (see summoners.views.show),
+        read through page_cache, or None if the summoner isn't known.
+
+        Each component is cached for as long as it would be considered fresh.
+        """
+        summoner = page_cache.get_or_set(SUMMONER, self.region,
+                                         summoner_key(self.summoner_id, self.std_name),
+                                         self._SUMMONER_UPDATE_INTERVAL,
+                                         self._summoner_data, cache_none=False)
+
+        if summoner is None:
+            return None
+
+        key = summoner_key(summoner_id=summoner['summoner_id'])
+        league_entry = page_cache.get_or_set(LEAGUE_ENTRY, self.region, key,
+                                             self._LEAGUE_UPDATE_INTERVAL,
+                                             self._league_entry_data)
+        recent_matches = page_cache.get_or_set(RECENT_MATCHES, self.region, key,
+                                               self._MATCH_HISTORY_UPDATE_INTERVAL,
+                                               self._recent_matches_data)
+
+        for match in recent_matches:
+            match['match_date'] = datetime.fromtimestamp(match['match_creation'] / 1000)
+
+        return {'summoner': summoner,
+                'league_entry': league_entry,
+                'recent_matches': recent_matches}
+
+    def _summoner_data(self):
+        summoner = self.get_instance()
+
+        if summoner is None:
+            return None
+
+        return {'id': summoner.id,
+                'summoner_id': summoner.summoner_id,
+                'name': summoner.name,
+                'region': summoner.region,
+                'summoner_level': summoner.summoner_level,
+                'profile_icon_id': summoner.profile_icon_id}
+
+    def _league_entry_data(self):
+        try:
+            entry = self.get_instance().league_entry()
+        except LeagueEntry.DoesNotExist:
+            return None
+
+        return {'tier': entry.league.tier,
+                'division': entry.division,
+                'league_points': entry.league_points,
+                'wins': entry.wins,
+                'losses': entry.losses}
+
+    def _recent_matches_data(self):
+        return list(self.get_instance().matches(10).values('match_id', 'region', 'match_creation'))
+
     def _query_match_history(self):
         return RiotAPI.get_match_list(summoner_id=self.summoner.summoner_id,
-                                      region=self.summoner.region)
+                                      region=self.summoner.region,
+                                      priority=INTERACTIVE)
 
     def _query_league(self):
-        return RiotAPI.get_league(summoner_ids=self.summoner.summoner_id, region=self.summoner.region)
+        return RiotAPI.get_league(summoner_ids=self.summoner.summoner_id, region=self.summoner.region,
+                                  priority=INTERACTIVE)
 
     # # TODO: Consider calling self.summoner.refresh_from_db().
     # def is_cache_fresh(self):
@@ -260,23 +364,33 @@ class SingleSummoner:
         -ranked stats of last season
 
         Requires self.summoner to exist.
+
+        If a full query of the summoner is already running (e.g. started by another
+        user), returns the task IDs of that query instead of starting another.
         """
-        logger.info('started on [{}] {}'.format(self.region, self.std_name))
+        def start():
+            logger.info('started on [{}] {}'.format(self.region, self.std_name))
+
+            self.get_instance().set_last_full_update()
+            match_job = self._query_match_history()
+            league_job = self._query_league()
 
-        self.get_instance().set_last_full_update()
-        match_job = self._query_match_history()
-        league_job = self._query_league()
+            return coalesce_task_ids([match_job, league_job])
 
         # This gets returned to the frontend. The frontend shows "Loading" until it gets a
         # positive response from multi_task_status. Then it can load the new data!
-        return coalesce_task_ids([match_job, league_job])
+        return query_flights.run(self.region, 'id:{}'.format(self.get_instance().summoner_id),
+                                 start)
 
     def blocking_full_query(self):
         logger.info('started on [{}] {}'.format(self.region, self.std_name))
 
-        self._query_match_history().get()
+        match_task_ids = self._query_match_history().get()['task_ids']
         self._query_league().get()
 
+        for task_id in match_task_ids:
+            AsyncResult(task_id).get()
+
         logger.info('complete')
 
     def partial_query(self):
@@ -295,3 +409,19 @@ class SingleSummoner:
             if not LeagueEntry.objects.filter(player_or_team_id=self.summoner.summoner_id,
                                               league__region=self.summoner.region).exists():
                 self._query_league()
+
+
+@app.task
+def finish_first_time_query(result, name, region):
+    """
+    Callback of the summoner lookup started by SingleSummoner.start_first_time_query.
+
+    Returns a dict of whether the summoner was found and the IDs of the full query's
+    tasks, which the page waits on next (see utils.functions.follow_up_task_ids).
+    """
+    ss = SingleSummoner(name=name, region=region)
+
+    if ss.handle_lookup_result(result):
+        return {'found': True, 'task_ids': ss.full_query()}
+    else:
+        return {'found': False, 'task_ids': []}
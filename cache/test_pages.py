@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from utils.testcases import RedisTestMixin
+from .pages import SummonerPageCache, summoner_key, SUMMONER, RECENT_MATCHES
+
+
+class SummonerPageCacheTestCase(RedisTestMixin, SimpleTestCase):
+    redis_prefix = 'test-page'
+
+    def setUp(self):
+        super().setUp()
+        self.cache = SummonerPageCache(prefix=self.redis_prefix)
+        self.loads = 0
+
+    def load(self, value):
+        def load():
+            self.loads += 1
+            return value
+
+        return load
+
+    def test_read_through(self):
+        """
+        Ensure a component is only loaded on a miss.
+        """
+        key = summoner_key(std_name='laughingstapler')
+        ttl = timedelta(minutes=15)
+
+        self.assertEqual(self.cache.get_or_set(SUMMONER, 'NA', key, ttl, self.load({'id': 1})),
+                         {'id': 1})
+        self.assertEqual(self.cache.get_or_set(SUMMONER, 'NA', key, ttl, self.load({'id': 2})),
+                         {'id': 1})
+        self.assertEqual(self.loads, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_cache_none(self):
+        """
+        Ensure None is only cached when asked to.
+        """
+        key = summoner_key(std_name='riotnonextantname')
+        ttl = timedelta(minutes=15)
+
+        self.cache.get_or_set(SUMMONER, 'NA', key, ttl, self.load(None), cache_none=False)
+        self.cache.get_or_set(SUMMONER, 'NA', key, ttl, self.load(None), cache_none=False)
+
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate_summoners(self):
+        """
+        Ensure a stored summoner's entries by ID and by name are both removed.
+        """
+        ttl = timedelta(minutes=15)
+        by_id = summoner_key(summoner_id=1)
+        by_name = summoner_key(std_name='laughingstapler')
+
+        self.cache.get_or_set(SUMMONER, 'NA', by_id, ttl, self.load({'id': 1}))
+        self.cache.get_or_set(SUMMONER, 'NA', by_name, ttl, self.load({'id': 1}))
+        self.cache.invalidate_summoners('NA', [{'id': 1, 'name': 'Laughing Stapler'}])
+        self.cache.get_or_set(SUMMONER, 'NA', by_id, ttl, self.load({'id': 1}))
+        self.cache.get_or_set(SUMMONER, 'NA', by_name, ttl, self.load({'id': 1}))
+
+        self.assertEqual(self.loads, 4)
+
+    def test_invalidate_recent_matches(self):
+        """
+        Ensure a stored match removes the recent matches of each of its players.
+        """
+        ttl = timedelta(minutes=15)
+        match = {'matchId': 1, 'region': 'NA',
+                 'participantIdentities': [{'player': {'summonerId': 1}},
+                                           {'player': {'summonerId': 2}}]}
+
+        self.cache.get_or_set(RECENT_MATCHES, 'NA', summoner_key(summoner_id=1), ttl, self.load([]))
+        self.cache.invalidate_recent_matches([match])
+        self.cache.get_or_set(RECENT_MATCHES, 'NA', summoner_key(summoner_id=1), ttl, self.load([]))
+
+        self.assertEqual(self.loads, 2)
@@ -0,0 +1,50 @@
+from uuid import uuid4
+
+from django.test import SimpleTestCase
+
+from lol_stats2.celery import app
+from utils.testcases import RedisTestMixin
+from .singleflight import SingleFlight
+
+
+class SingleFlightTestCase(RedisTestMixin, SimpleTestCase):
+    redis_prefix = 'test-singleflight'
+
+    def setUp(self):
+        super().setUp()
+        self.flights = SingleFlight(prefix=self.redis_prefix)
+        self.started = []
+
+    def start(self):
+        """
+        Stands in for starting a query, its task has no result, i.e. is still running.
+        """
+        task_ids = [str(uuid4())]
+        self.started.append(task_ids)
+        return task_ids
+
+    def test_attaches_to_running_query(self):
+        """
+        Ensure a query that is still running is joined instead of started again.
+        """
+        task_ids = self.flights.run('NA', 'id:1', self.start)
+
+        self.assertEqual(self.flights.run('na', 'id:1', self.start), task_ids)
+        self.assertEqual(len(self.started), 1)
+
+    def test_restarts_finished_query(self):
+        """
+        Ensure a new query is started once the previous one's tasks are done.
+        """
+        task_ids = self.flights.run('NA', 'id:1', self.start)
+        app.backend.mark_as_done(task_ids[0], None)
+
+        self.assertNotEqual(self.flights.run('NA', 'id:1', self.start), task_ids)
+        self.assertEqual(len(self.started), 2)
+
+    def test_keys_are_separate(self):
+        self.flights.run('NA', 'id:1', self.start)
+        self.flights.run('NA', 'name:1', self.start)
+        self.flights.run('EUW', 'id:1', self.start)
+
+        self.assertEqual(len(self.started), 3)
@@ -1,6 +1,8 @@
+from celery.result import AsyncResult
 from django.test import TestCase
 
 from summoners.models import Summoner
+from utils.functions import follow_up_task_ids
 from .summoners import SingleSummoner
 
 # FIXME: As it stands, this exceeds the rate limit and starts failing for reasons related.
@@ -56,4 +58,15 @@ class SingleSummonerTestCase(TestCase):
         self.assertFalse(Summoner.objects.filter(region=region).filter(name__iexact=name).exists())
         self.assertTrue(ss.is_invalid_query())
 
+    def test_start_first_time_query_of_nonextant_summoner(self):
+        """
+        Ensure the asynchronous query returns the lookup's task ID and, once it is done,
+        the query is blacklisted and there is nothing more to wait on.
+        """
+        ss = SingleSummoner(name='RiotNonextantName', region='NA')
+        task_ids = ss.start_first_time_query()
 
+        self.assertEqual(len(task_ids), 1)
+        self.assertEqual(AsyncResult(task_ids[0]).get(), {'found': False, 'task_ids': []})
+        self.assertTrue(ss.is_invalid_query())
+        self.assertEqual(follow_up_task_ids(task_ids), [])
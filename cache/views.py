@@ -4,12 +4,16 @@ from django.http import JsonResponse, HttpResponseBadRequest
 
 # from .summoners import SingleSummoner
 from summoners.models import Summoner
-from utils.functions import multi_task_status
+from utils.functions import multi_task_status, follow_up_task_ids
 
 logger = logging.getLogger(__name__)
 
 
 def task_status(request):
+    """
+    Returns whether all of the given tasks were successful and, if so, the IDs of
+    any tasks they started that should be waited on next.
+    """
     # logger.debug(request.POST)
     logger.debug(request.POST.getlist('task_ids[]'))
 
@@ -17,7 +21,10 @@ def task_status(request):
     if request.is_ajax():
         if 'task_ids[]' in request.POST:
             task_ids = request.POST.getlist('task_ids[]')
-            return JsonResponse({'success': multi_task_status(task_ids)})
+            success = multi_task_status(task_ids)
+
+            return JsonResponse({'success': success,
+                                 'task_ids': follow_up_task_ids(task_ids) if success else []})
         else:
             return HttpResponseBadRequest
     else:
@@ -11,8 +11,12 @@ class Command(BaseCommand):
                             nargs='?',
                             default='6.1',
                             help='The patch number to consider')
+        parser.add_argument('--region',
+                            nargs='?',
+                            default='ALL',
+                            help='The region to consider')
 
     def handle(self, *args, **options):
-        Champion.objects.full_agg_for_all(version=options['patch'])
+        Champion.objects.grouped_agg_for_all(version=options['patch'], region=options['region'])
 
         self.stdout.write(self.style.MIGRATE_SUCCESS('Done!'))
\ No newline at end of file
@@ -3,9 +3,9 @@ import logging
 from tqdm import tqdm
 from django.db import models
 from django.apps import apps
-from django.db.models import Sum, Avg
+from django.db.models import Sum, Avg, Count, Case, When, Value, IntegerField
 
-from stats.models import ChampionStats
+from stats.models import Bucket, ChampionStats
 from utils.functions import is_complete_version, get_latest_version
 from utils.constants import VALID_LANE_ROLE_COMBOS
 
@@ -27,11 +27,70 @@ class ChampionManager(models.Manager):
 
         return champion
 
+    def grouped_agg_for_all(self, version, region='ALL'):
+        """
+        Aggregates picks, wins, losses and the sums and averages of every
+        Champion.aggregable_participant_fields field for all champions in all
+        VALID_LANE_ROLE_COMBOS using one grouped scan of Participant joined to
+        ParticipantTimeline.
+
+        The results are written to ChampionStats with a single bulk upsert.
+
+        See Champion.total_picks for valid values of `version` and `region`.
+
+        Returns the number of ChampionStats rows written.
+        """
+        Participant = apps.get_model('matches', 'Participant')
+        fields = Champion.aggregable_participant_fields
+
+        queryset = Participant.objects.all()
+
+        if region and region != 'ALL':
+            queryset = queryset.filter(match_detail__region=region)
+
+        queryset, complete_version = Champion._mutate_participant_query_for_version(queryset,
+                                                                                    version)
+
+        sums = {'sum_{}'.format(field): Sum(field) for field in fields}
+        wins = Sum(Case(When(winner=True, then=Value(1)),
+                        default=Value(0),
+                        output_field=IntegerField()))
+
+        groups = queryset.values('champion_id',
+                                 'participanttimeline__lane',
+                                 'participanttimeline__role') \
+                         .annotate(sum_picks=Count('id'), sum_wins=wins, **sums) \
+                         .order_by()
+
+        valid_combos = set((combo['lane'], combo['role']) for combo in VALID_LANE_ROLE_COMBOS)
+        known_champions = set(self.values_list('champion_id', flat=True))
+        buckets = Bucket.objects.ensure_buckets(
+            (version, complete_version, region, lane, role) for lane, role in valid_combos)
+
+        rows = []
+
+        for group in groups:
+            combo = (group.pop('participanttimeline__lane'), group.pop('participanttimeline__role'))
+
+            if combo not in valid_combos or group['champion_id'] not in known_champions:
+                continue
+
+            group['bucket_id'] = buckets[(version, region) + combo]
+            group['sum_losses'] = group['sum_picks'] - group['sum_wins']
+            rows.append(ChampionStats.objects.derive_from_sums(group, fields))
+
+        logger.info('Aggregated %s champion-position groups for version %s, region %s',
+                    len(rows), version, region)
+
+        return ChampionStats.objects.bulk_upsert(rows)
+
     def full_agg_for_all(self, version):
-        with tqdm(total=self.count()) as pbar:
-            for champ in self.all():
-                champ.full_agg(version)
-                pbar.update(1)
+        """
+        Aggregates stats for all champions and positions for the given version.
+
+        See grouped_agg_for_all.
+        """
+        return self.grouped_agg_for_all(version)
 
 class Champion(models.Model):
     """
@@ -71,7 +130,8 @@ class Champion(models.Model):
 
     # TODO: Create a means of determining how to traverse related tables so we can get to
     # match_version from any starting point/model manager.
-    def _mutate_participant_query_for_version(self, queryset, version):
+    @staticmethod
+    def _mutate_participant_query_for_version(queryset, version):
         """
         Accepts a version string and a queryset on ParticipantManager.
 
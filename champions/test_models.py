@@ -1,6 +1,11 @@
+from copy import deepcopy
+
 from django.test import TestCase
 from django.forms.models import model_to_dict
 
+from matches.models import MatchDetail
+from matches.test_models import TestMatchModels
+from stats.models import ChampionStats
 from .models import Champion
 
 class ChampionTestCase(TestCase):
@@ -34,3 +39,92 @@ class ChampionTestCase(TestCase):
         wilgo = Champion.objects.get(name='Wilgo')
 
         self.assertEqual('Wilgo', str(wilgo))
+
+
+class GroupedAggregationTestCase(TestMatchModels):
+    def setUp(self):
+        super(GroupedAggregationTestCase, self).setUp()
+
+        for participant in self.match_data['participants']:
+            champion_id = participant['championId']
+            Champion.objects.create(champion_id=champion_id, title='', name=str(champion_id),
+                                    key=str(champion_id))
+
+    def test_grouped_agg_for_all(self):
+        """
+        Ensure a grouped aggregation writes one ChampionStats row per champion-position.
+        """
+        written = Champion.objects.grouped_agg_for_all('5.9')
+
+        self.assertEqual(written, 10)
+
+        stats = ChampionStats.objects.get(champion_id=99,
+                                          bucket__version='5.9',
+                                          bucket__region='ALL',
+                                          bucket__lane='MIDDLE',
+                                          bucket__role='SOLO')
+
+        self.assertEqual(stats.sum_picks, 1)
+        self.assertEqual(stats.sum_wins, 1)
+        self.assertEqual(stats.sum_losses, 0)
+        self.assertEqual(stats.sum_kills, 14)
+        self.assertEqual(stats.avg_kills, 14)
+        self.assertEqual(stats.win_rate, 100)
+
+    def test_grouped_agg_for_all_replaces_existing(self):
+        """
+        Ensure rerunning the aggregation replaces rather than duplicates stats.
+        """
+        Champion.objects.grouped_agg_for_all('5.9')
+        Champion.objects.grouped_agg_for_all('5.9')
+
+        self.assertEqual(ChampionStats.objects.count(), 10)
+
+    def test_fold_matches_matches_full_aggregation(self):
+        """
+        Ensure folding a new match into seeded buckets gives the same stats as a
+        full aggregation.
+        """
+        Champion.objects.grouped_agg_for_all('5.9')
+
+        second_match_data = deepcopy(self.match_data)
+        second_match_data['matchId'] += 1
+        second_match = MatchDetail.objects.create_match(second_match_data)
+
+        ChampionStats.objects.fold_matches([second_match.id])
+        folded = ChampionStats.objects.get(champion_id=99, bucket__version='5.9',
+                                           bucket__lane='MIDDLE', bucket__role='SOLO')
+
+        self.assertEqual(folded.sum_picks, 2)
+        self.assertEqual(folded.sum_kills, 28)
+        self.assertEqual(folded.avg_kills, 14)
+
+        Champion.objects.grouped_agg_for_all('5.9')
+        recomputed = ChampionStats.objects.get(pk=folded.pk)
+
+        self.assertEqual(folded.sum_wins, recomputed.sum_wins)
+        self.assertEqual(folded.avg_deaths, recomputed.avg_deaths)
+        self.assertEqual(folded.win_rate, recomputed.win_rate)
+
+    def test_fold_matches_skips_unknown_champions(self):
+        """
+        Ensure participants of champions that aren't stored yet are left out of the fold.
+        """
+        Champion.objects.grouped_agg_for_all('5.9')
+
+        second_match_data = deepcopy(self.match_data)
+        second_match_data['matchId'] += 1
+        second_match_data['participants'][0]['championId'] = 9999
+        second_match = MatchDetail.objects.create_match(second_match_data)
+
+        ChampionStats.objects.fold_matches([second_match.id])
+
+        self.assertFalse(ChampionStats.objects.filter(champion_id=9999).exists())
+
+    def test_fold_matches_ignores_unseeded_buckets(self):
+        """
+        Ensure folding doesn't create stats for buckets that were never aggregated.
+        """
+        ChampionStats.objects.fold_matches([self.match.id])
+
+        self.assertFalse(ChampionStats.objects.exists())
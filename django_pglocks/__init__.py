@@ -3,29 +3,116 @@ __version__ = '1.0.2'
 from contextlib import contextmanager
 from zlib import crc32
 
+
+def _signed_crc32(value):
+    # Generates an id within postgres integer range (-2^31 to 2^31 - 1).
+    # crc32 generates an unsigned integer in Py3, we convert it into
+    # a signed integer using 2's complement (this is a noop in Py2)
+    pos = crc32(value.encode("utf-8"))
+    lock_id = (2**31 - 1) & pos
+    if pos & 2**31:
+        lock_id -= 2**31
+    return lock_id
+
+
+def lock_id_for(namespace, *parts):
+    """
+    Returns a two-int lock id for an entity identified by `parts` within
+    `namespace` (e.g. a model name), for fine-grained locks that don't
+    collide with those of other namespaces.
+    """
+    return (_signed_crc32(namespace),
+            _signed_crc32('|'.join(str(part) for part in parts)))
+
+
+class LockStats(object):
+    """
+    Collects the metrics reported by advisory_lock's signals, per lock id,
+    while connected.
+    """
+    def __init__(self):
+        self.stats = {}
+
+    def _stats_for(self, lock_id):
+        if lock_id not in self.stats:
+            self.stats[lock_id] = {'acquired': 0,
+                                   'contended': 0,
+                                   'not_acquired': 0,
+                                   'wait_time': 0.0,
+                                   'max_wait_time': 0.0,
+                                   'hold_time': 0.0,
+                                   'max_hold_time': 0.0}
+        return self.stats[lock_id]
+
+    def connect(self):
+        from .signals import lock_acquired, lock_not_acquired, lock_released
+
+        lock_acquired.connect(self._on_acquired, dispatch_uid=id(self))
+        lock_not_acquired.connect(self._on_not_acquired, dispatch_uid=id(self))
+        lock_released.connect(self._on_released, dispatch_uid=id(self))
+
+    def disconnect(self):
+        from .signals import lock_acquired, lock_not_acquired, lock_released
+
+        lock_acquired.disconnect(dispatch_uid=id(self))
+        lock_not_acquired.disconnect(dispatch_uid=id(self))
+        lock_released.disconnect(dispatch_uid=id(self))
+
+    def _on_acquired(self, sender, lock_id, wait_time, contended, **kwargs):
+        stats = self._stats_for(lock_id)
+        stats['acquired'] += 1
+        stats['contended'] += int(contended)
+        stats['wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+
+    def _on_not_acquired(self, sender, lock_id, wait_time, **kwargs):
+        stats = self._stats_for(lock_id)
+        stats['not_acquired'] += 1
+        stats['contended'] += 1
+        stats['wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+
+    def _on_released(self, sender, lock_id, hold_time, **kwargs):
+        stats = self._stats_for(lock_id)
+        stats['hold_time'] += hold_time
+        stats['max_hold_time'] = max(stats['max_hold_time'], hold_time)
+
+
 @contextmanager
-def advisory_lock(lock_id, shared=False, wait=True, using=None):
+def advisory_lock(lock_id, shared=False, wait=True, using=None, timeout=None,
+                  backoff=(0.01, 0.5)):
+    """
+    Holds a Postgres advisory lock for the duration of the block, yielding
+    whether it was acquired.
+
+    The lock is first tried without blocking, so that contention can be
+    reported. If it is held elsewhere and `wait` is True, this blocks until it
+    is acquired or, if `timeout` (seconds) is given, polls for it with
+    exponential backoff (from backoff[0] up to backoff[1] seconds between
+    tries) until the timeout passes, in which case False is yielded.
+
+    Sends the signals in django_pglocks.signals to report acquire latency,
+    contention, timeouts and hold duration per lock id (see LockStats).
+    """
+    import time
 
     from django.db import DEFAULT_DB_ALIAS, connections, transaction
     from django.utils import six
 
+    from .signals import lock_acquired, lock_not_acquired, lock_released
+
     if using is None:
         using = DEFAULT_DB_ALIAS
 
-    # Assemble the function name based on the options.
+    # Assemble the function names based on the options.
 
-    function_name = 'pg_'
-
-    if not wait:
-        function_name += 'try_'
-
-    function_name += 'advisory_lock'
+    function_name = 'pg_advisory_lock'
+    try_function_name = 'pg_try_advisory_lock'
+    release_function_name = 'pg_advisory_unlock'
 
     if shared:
         function_name += '_shared'
-
-    release_function_name = 'pg_advisory_unlock'
-    if shared:
+        try_function_name += '_shared'
         release_function_name += '_shared'
 
     # Format up the parameters.
@@ -40,14 +127,9 @@ def advisory_lock(lock_id, shared=False, wait=True, using=None):
             raise ValueError("Both members of a tuple/list lock ID must be integers")
 
         tuple_format = True
+        lock_id = tuple(lock_id)
     elif isinstance(lock_id, six.string_types):
-        # Generates an id within postgres integer range (-2^31 to 2^31 - 1).
-        # crc32 generates an unsigned integer in Py3, we convert it into
-        # a signed integer using 2's complement (this is a noop in Py2)
-        pos = crc32(lock_id.encode("utf-8"))
-        lock_id = (2**31 - 1) & pos
-        if pos & 2**31:
-            lock_id -= 2**31
+        lock_id = _signed_crc32(lock_id)
     elif not isinstance(lock_id, six.integer_types):
         raise ValueError("Cannot use %s as a lock id" % lock_id)
 
@@ -58,17 +140,36 @@ def advisory_lock(lock_id, shared=False, wait=True, using=None):
         base = "SELECT %s(%d)"
         params = (lock_id,)
 
-    acquire_params = ( function_name, ) + params
-
-    command = base % acquire_params
     cursor = connections[using].cursor()
 
-    cursor.execute(command)
+    def try_acquire():
+        cursor.execute(base % ((try_function_name, ) + params))
+        return cursor.fetchone()[0]
+
+    start = time.time()
+    acquired = try_acquire()
+    contended = not acquired
 
-    if not wait:
-        acquired = cursor.fetchone()[0]
+    if contended and wait:
+        if timeout is None:
+            cursor.execute(base % ((function_name, ) + params))
+            acquired = True
+        else:
+            deadline = start + timeout
+            delay = backoff[0]
+
+            while not acquired and time.time() < deadline:
+                time.sleep(min(delay, max(deadline - time.time(), 0)))
+                delay = min(delay * 2, backoff[1])
+                acquired = try_acquire()
+
+    acquired_at = time.time()
+
+    if acquired:
+        lock_acquired.send(sender=None, lock_id=lock_id, wait_time=acquired_at - start,
+                           contended=contended)
     else:
-        acquired = True
+        lock_not_acquired.send(sender=None, lock_id=lock_id, wait_time=acquired_at - start)
 
     try:
         yield acquired
@@ -79,4 +180,6 @@ def advisory_lock(lock_id, shared=False, wait=True, using=None):
             command = base % release_params
             cursor.execute(command)
 
+            lock_released.send(sender=None, lock_id=lock_id, hold_time=time.time() - acquired_at)
+
         cursor.close()
@@ -0,0 +1,19 @@
+"""
+Signals sent by advisory_lock, e.g. for collecting lock metrics (see LockStats).
+
+lock_id is the id as passed to Postgres: an int, or a 2-tuple of ints.
+Times are in seconds.
+"""
+
+from django.dispatch import Signal
+
+# Sent when a lock is acquired. `contended` is True if the lock was held
+# elsewhere when first tried.
+lock_acquired = Signal(providing_args=['lock_id', 'wait_time', 'contended'])
+
+# Sent when a lock is released.
+lock_released = Signal(providing_args=['lock_id', 'hold_time'])
+
+# Sent when a lock isn't acquired, i.e. on timeout, or right away if it was
+# held elsewhere and wait=False.
+lock_not_acquired = Signal(providing_args=['lock_id', 'wait_time'])
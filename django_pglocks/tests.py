@@ -1,7 +1,10 @@
+import threading
+
 from django.db import connection
 from django.test import TransactionTestCase
 
-from django_pglocks import advisory_lock
+from django_pglocks import advisory_lock, lock_id_for, LockStats
+from django_pglocks.signals import lock_not_acquired
 
 
 class PgLocksTests(TransactionTestCase):
@@ -44,3 +47,82 @@ class PgLocksTests(TransactionTestCase):
             self.assertTrue(acquired)
             self.assertNumLocks(1)
         self.assertNumLocks(0)
+
+    def test_lock_id_for(self):
+        lock_id = lock_id_for('league', 'NA', 'RANKED_SOLO_5x5', "Faker's Fighters", 'GOLD')
+        self.assertEqual(len(lock_id), 2)
+        self.assertNotEqual(lock_id, lock_id_for('league', 'NA', 'RANKED_SOLO_5x5',
+                                                 "Faker's Fighters", 'SILVER'))
+        self.assertNumLocks(0)
+        with advisory_lock(lock_id) as acquired:
+            self.assertTrue(acquired)
+            self.assertNumLocks(1)
+        self.assertNumLocks(0)
+
+    def hold_lock_in_thread(self, lock_id):
+        """
+        Acquires lock_id on another connection (each thread has its own) and holds it
+        until the returned event is set.
+        """
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with advisory_lock(lock_id):
+                acquired.set()
+                release.wait()
+            connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        acquired.wait()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+
+        return release
+
+    def test_timeout(self):
+        self.hold_lock_in_thread('test')
+        with advisory_lock('test', timeout=0.1) as acquired:
+            self.assertFalse(acquired)
+
+    def test_timeout_reports_wait(self):
+        waits = []
+
+        def on_not_acquired(sender, lock_id, wait_time, **kwargs):
+            waits.append(wait_time)
+
+        lock_not_acquired.connect(on_not_acquired)
+        self.addCleanup(lock_not_acquired.disconnect, on_not_acquired)
+
+        self.hold_lock_in_thread('test')
+        with advisory_lock('test', timeout=0.2, backoff=(0.01, 0.05)) as acquired:
+            self.assertFalse(acquired)
+
+        # Gives up once the timeout passes, without waiting for the lock.
+        self.assertEqual(len(waits), 1)
+        self.assertGreaterEqual(waits[0], 0.2)
+        self.assertLess(waits[0], 1)
+
+    def test_timeout_acquires_once_released(self):
+        release = self.hold_lock_in_thread('test')
+        threading.Timer(0.1, release.set).start()
+        with advisory_lock('test', timeout=5) as acquired:
+            self.assertTrue(acquired)
+
+    def test_lock_stats(self):
+        stats = LockStats()
+        stats.connect()
+        self.addCleanup(stats.disconnect)
+
+        with advisory_lock(123):
+            pass
+
+        self.hold_lock_in_thread(123)
+        with advisory_lock(123, wait=False):
+            pass
+
+        # One acquisition each by this thread and the other thread.
+        self.assertEqual(stats.stats[123]['acquired'], 2)
+        self.assertEqual(stats.stats[123]['contended'], 1)
+        self.assertEqual(stats.stats[123]['not_acquired'], 1)
@@ -6,14 +6,25 @@ from django.db import models
 from django.db import transaction
 from django.db.models import Q
 
+from django_pglocks import lock_id_for
 from summoners.models import Summoner
+from utils.db import bulk_update
 from utils.functions import underscore_dict
 from utils.constants import TIER_ORDER
+from utils.mixins import IterableDataFieldsMixin
 
 logger = logging.getLogger(__name__)
 
 
 class LeagueManager(models.Manager):
+    @staticmethod
+    def lock_id(attrs, region):
+        """
+        Returns the advisory lock id of the league described by attrs in region,
+        i.e. a hash of its natural key (region, queue, name, tier).
+        """
+        return lock_id_for('league', region.upper(), attrs['queue'], attrs['name'], attrs['tier'])
+
     # NOTE: Something called by this is changing the values of passed attrs.
     # See leagues/test_models re: need to use a separate entries dict instead of
     # being able to mutate the original dict used to create the league entries.
@@ -48,8 +59,7 @@ class LeagueManager(models.Manager):
             logger.debug(league)
             league.last_update = datetime.now(tz=pytz.utc)
             league.save()
-            league.leagueentry_set.all().delete()
-            league.leagueentry_set.create_entries(attrs)
+            league.leagueentry_set.sync_entries(attrs)
 
             return league
 
@@ -97,9 +107,9 @@ class LeagueEntryManager(models.Manager):
 
             return flattened
 
-    def create_entries(self, attrs):
+    def _entry_kwargs(self, attrs):
         """
-        Bulk create LeagueEntry records from a dict containing a list of entries.
+        Returns a list of LeagueEntry init kwargs from a dict containing a list of entries.
         """
         entries = attrs['entries']
         underscore_entries = [entry for entry in map(underscore_dict, entries)]
@@ -109,11 +119,71 @@ class LeagueEntryManager(models.Manager):
         for entry in flattened_entries:
             entry['league_id'] = self.instance.id
 
+        return flattened_entries
+
+    def create_entries(self, attrs):
+        """
+        Bulk create LeagueEntry records from a dict containing a list of entries.
+        """
+        flattened_entries = self._entry_kwargs(attrs)
+
         entry_objs = [LeagueEntry(**kwargs) for kwargs in flattened_entries]
         self.bulk_create(entry_objs)
 
         logger.debug('Bulk created {} league entries'.format(len(flattened_entries)))
 
+    def sync_entries(self, attrs):
+        """
+        Makes the league's stored entries match those in a dict containing a list of
+        entries, by player_or_team_id.
+
+        Only entries that changed are written: new entries are bulk created, changed
+        entries are updated with a single statement and entries that are no longer
+        in the league are deleted with a single statement.
+
+        Returns a dict with the number of entries created, updated and deleted.
+        """
+        fields = [f for f in LeagueEntry.data_fields() if f != 'player_or_team_id']
+        incoming = {}
+
+        for kwargs in self._entry_kwargs(attrs):
+            # Entries that aren't in a series don't include the series fields,
+            # and values are coerced to what they'll be read back from the DB as.
+            entry = LeagueEntry(**kwargs)
+
+            for f in fields + ['player_or_team_id']:
+                setattr(entry, f, LeagueEntry._meta.get_field(f).to_python(getattr(entry, f)))
+
+            incoming[entry.player_or_team_id] = entry
+
+        stored = {values['player_or_team_id']: values
+                  for values in self.values('id', 'player_or_team_id', *fields)}
+
+        to_create = [entry for player_or_team_id, entry in incoming.items()
+                     if player_or_team_id not in stored]
+        to_update = []
+
+        for player_or_team_id, values in stored.items():
+            entry = incoming.get(player_or_team_id)
+
+            if entry is not None and any(getattr(entry, f) != values[f] for f in fields):
+                to_update.append([values['id']] + [getattr(entry, f) for f in fields])
+
+        to_delete = [values['id'] for player_or_team_id, values in stored.items()
+                     if player_or_team_id not in incoming]
+
+        with transaction.atomic():
+            self.bulk_create(to_create)
+            bulk_update(LeagueEntry, fields, to_update)
+
+            if to_delete:
+                self.filter(id__in=to_delete).delete()
+
+        logger.debug('Synced league entries of {}: {} created, {} updated, {} deleted'.format(
+            self.instance, len(to_create), len(to_update), len(to_delete)))
+
+        return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(to_delete)}
+
     def get_summoner_ids_by_min_tier(self, region, tier):
         # TODO: Use __in instead.
         bronze = Q(league__tier='BRONZE')
@@ -158,7 +228,7 @@ class LeagueEntryManager(models.Manager):
             .distinct()
 
 
-class LeagueEntry(models.Model):
+class LeagueEntry(IterableDataFieldsMixin, models.Model):
     """
     Maps to Riot API LeagueEntry DTO.
 
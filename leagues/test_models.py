@@ -1,3 +1,4 @@
+from copy import deepcopy
 from datetime import datetime, timedelta
 
 from django.test import TestCase
@@ -157,6 +158,42 @@ class LeagueTestCase(TestCase):
 
         self.assertTrue(League.objects.filter(name="Faker's Fighters").exists())
 
+    def test_sync_entries_only_writes_changes(self):
+        """
+        Ensure syncing entries creates, updates and deletes only the entries that changed
+        and keeps the rows of the entries that didn't.
+        """
+        league = League.objects.create_league(deepcopy(self.league_attrs_different_entries),
+                                              'NA')
+        unchanged = league.leagueentry_set.get(player_or_team_id='8888')
+        changed = league.leagueentry_set.get(player_or_team_id='7777')
+
+        attrs = deepcopy(self.league_attrs_different_entries)
+        attrs['entries'][0]['leaguePoints'] = 24
+        new_entry = deepcopy(attrs['entries'][1])
+        new_entry['playerOrTeamId'] = 9999
+        new_entry['playerOrTeamName'] = 'challenger5'
+        attrs['entries'].append(new_entry)
+
+        result = league.leagueentry_set.sync_entries(attrs)
+
+        self.assertEqual(result, {'created': 1, 'updated': 1, 'deleted': 0})
+        self.assertEqual(league.leagueentry_set.count(), 3)
+        self.assertEqual(league.leagueentry_set.get(player_or_team_id='8888').id, unchanged.id)
+
+        changed.refresh_from_db()
+        self.assertEqual(changed.league_points, 24)
+        self.assertEqual(changed.series_losses, 2)
+
+        attrs = deepcopy(self.league_attrs_different_entries)
+        attrs['entries'].pop(0)
+
+        result = league.leagueentry_set.sync_entries(attrs)
+
+        self.assertEqual(result, {'created': 0, 'updated': 0, 'deleted': 2})
+        self.assertEqual(list(league.leagueentry_set.values_list('player_or_team_id', flat=True)),
+                         ['8888'])
+
 class LeagueEntryTestCase(TestCase):
     def setUp(self):
         self.attrs_base = {'division': 'I',
@@ -217,4 +254,4 @@ class LeagueEntryTestCase(TestCase):
         full_entry.update(self.attrs_miniseries)
 
         self.assertNotIn('series_losses',
-                         LeagueEntry.objects._flatten_entry_if_series(full_entry))
\ No newline at end of file
+                         LeagueEntry.objects._flatten_entry_if_series(full_entry))
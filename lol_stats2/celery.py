@@ -9,9 +9,13 @@ Alternatively, use restart_workers.sh.
 
 import os
 import logging
+import time
 
 from celery import Celery
+from celery.contrib.batches import Batches
+from celery.signals import worker_process_shutdown, worker_ready
 from celery.exceptions import MaxRetriesExceededError
+from requests.exceptions import ConnectionError, Timeout
 from riotwatcher.riotwatcher import (RiotWatcher,
                                      LoLException,
                                      error_400,
@@ -23,14 +27,25 @@ from riotwatcher.riotwatcher import (RiotWatcher,
                                      error_503,
                                      error_504)
 from django_pglocks import advisory_lock
+from django_pglocks.signals import lock_acquired
 from django.conf import settings
+from django.db import OperationalError, transaction
+from django.dispatch import receiver
 
 from summoners.models import Summoner
 from champions.models import Champion
 from spells.models import SummonerSpell
 from leagues.models import League
 from matches.models import MatchDetail
+from matches.bloom import match_filter
+from cache.pages import page_cache
 from items.models import Item
+from stats.models import ChampionStats
+from riot_api.inflight import match_claims
+from riot_api.ratelimit import RateLimiter
+from riot_api.routing import INTERACTIVE
+from riot_api.static_cache import StaticDataCache
+from utils.functions import underscore_key_stats
 from lol_stats2.settings.secrets import RIOT_API_KEY
 
 # Currently only used in the event of a 5xx HTTP response code from Riot's API.
@@ -39,6 +54,26 @@ RIOT_API_RETRY_DELAY = 1
 # Used when a non-API rate limit is in effect (e.g. by some Riot service that their API relies on)
 NON_API_LIMIT_RETRY_DELAY = 1
 
+# Waits for the shared rate limiter shorter than this are slept off in the worker,
+# longer ones reschedule the task, up to RATE_LIMIT_MAX_RETRIES times.
+RATE_LIMIT_MAX_SLEEP = 1
+RATE_LIMIT_MAX_RETRIES = 100
+
+# store_match_batch stores the matches it has received once it has this many,
+# or this many seconds after the last flush, whichever comes first.
+# The batch size must be less than the store workers' prefetch count
+# (concurrency * CELERYD_PREFETCH_MULTIPLIER), or a batch never fills up and is
+# only flushed by the interval. That is 40 with the default multiplier of 4 and
+# the `-c 10` that workers_restart.sh starts the store workers with; revisit
+# this if either changes.
+STORE_MATCH_BATCH_SIZE = 20
+STORE_MATCH_BATCH_INTERVAL = 1
+
+# How many times a batch is stored before giving up on it, when its transaction is
+# aborted by Postgres (e.g. a deadlock), and the delay between tries in seconds.
+STORE_MATCH_BATCH_ATTEMPTS = 3
+STORE_MATCH_BATCH_RETRY_DELAY = .5
+
 logger = logging.getLogger(__name__)
 
 # Set the default Django settings module
@@ -46,7 +81,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lol_stats2.settings.base')
 
 app = Celery('lol_stats2',
              broker='amqp://',
-             backend='redis://'
+             backend=settings.REDIS_URL
              )
 
 # Using a string here means the worker will not have to pickle the object
@@ -54,28 +89,68 @@ app = Celery('lol_stats2',
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
-riot_watcher = RiotWatcher(RIOT_API_KEY)
+riot_watcher = RiotWatcher(RIOT_API_KEY,
+                           pool_size=settings.RIOT_API_POOL_SIZE,
+                           timeout=settings.RIOT_API_TIMEOUT)
+rate_limiter = RateLimiter(RIOT_API_KEY,
+                           interactive_share=settings.RIOT_API_INTERACTIVE_SHARE)
+static_cache = StaticDataCache()
+
+@receiver(lock_acquired)
+def log_lock_wait(sender, lock_id, wait_time, contended, **kwargs):
+    if contended:
+        logger.info('Waited %.3f sec for contended lock %s', wait_time, lock_id)
+
+
+@worker_process_shutdown.connect
+def log_key_conversion_stats(**kwargs):
+    logger.info('Key conversion cache: %s', underscore_key_stats())
+
+
+@worker_ready.connect
+def build_match_filters(**kwargs):
+    """
+    Queues building any missing match filters, rather than building them here,
+    which would keep the worker from consuming until they are built.
+    """
+    rebuild_match_filters.delay()
+
+
+@app.task(ignore_result=True)
+def rebuild_match_filters():
+    """
+    Builds the match filters (see matches.bloom) of regions that don't have one.
+    Only one worker builds a region, the others skip it.
+    """
+    match_filter.rebuild_missing()
 
 # TODO: Move tasks into separate modules.
-# TODO: Create separate task for static API calls (not counted against rate limit).
 
-@app.task(bind=True, ignore_result=False, rate_limit='.7/s', max_retries=3,
+@app.task(bind=True, ignore_result=False, max_retries=3,
           default_retry_delay=RIOT_API_RETRY_DELAY)
-def riot_api(self, kwargs):
+def riot_api(self, kwargs, rate_limit_waits=0):
     """
     A rate-limited task that queries the Riot API using a RiotWatcher instance.
 
-    Celery accepts a single rate limit for a task, but Riot expresses
-    limits in 2 forms (neither of which can be exceeded):
+    Riot expresses limits in 2 forms (neither of which can be exceeded),
+    per API key and region:
     10 req / 10 sec
     500 req / 10 min
 
-    A rate_limit of .8/s very rarely generates a 429 API rate limit error with
-    a Retry-After header of 0-1 sec.
+    These are enforced for all workers at once by `rate_limiter` (see
+    riot_api.ratelimit), so workers can be added without exceeding them.
+    Calls with an interactive `priority` (see riot_api.routing) may use the share
+    of the limits reserved for them, crawls may not.
+    Static data calls don't count against the limits and aren't throttled; their
+    responses are cached per version (see riot_api.static_cache).
+    When the limiter has no room, the task waits (short waits) or is rescheduled
+    (long waits, up to RATE_LIMIT_MAX_RETRIES times). Reschedules are counted in
+    `rate_limit_waits`, apart from the retries below, so they don't use those up.
 
     This task will retry up to 3 times in the following cases:
-     -5xx error, retries in RIOT_API_RETRY_DELAY seconds.
-     -429 error, retries based on `Retry-After` header in response.
+     -5xx error, connection error or timeout, retries in RIOT_API_RETRY_DELAY seconds.
+     -429 error, retries based on `Retry-After` header in response, which also
+      blocks all other requests to the region for that long.
     """
     logger.debug('kwargs: {}, task ID: {}'.format(kwargs, self.request.id))
 
@@ -84,15 +159,52 @@ def riot_api(self, kwargs):
     if 'region' in kwargs and kwargs['region'] is not None:
         kwargs['region'] = kwargs['region'].lower()
 
-    # Create a copy of kwargs w/o `method` to pass to `func`, as modifying the original
-    # `kwargs` breaks task retrying (as would occur if we exceed rate limit, etc).
+    region = kwargs.get('region') or riot_watcher.default_region
+    interactive = kwargs.get('priority') == INTERACTIVE
+
+    def release_claim():
+        # Called when the task ends without a match, so the next crawl that finds
+        # it can try again instead of waiting out MATCH_CLAIM_TTL.
+        if kwargs['method'] == 'get_match':
+            match_claims.release(region, [kwargs['match_id']])
+
+    if not kwargs['method'].startswith('static_'):
+        wait = rate_limiter.acquire(region, interactive)
+
+        while wait:
+            if wait > RATE_LIMIT_MAX_SLEEP:
+                if rate_limit_waits >= RATE_LIMIT_MAX_RETRIES:
+                    release_claim()
+                    raise MaxRetriesExceededError(
+                        'Rescheduled {} times for the rate limit'.format(rate_limit_waits))
+
+                logger.debug('Rate limit reached for %s, retrying in %s sec', region, wait)
+                # Retrying always increments request.retries, so the allowed
+                # retries are raised to match.
+                raise self.retry(kwargs={'rate_limit_waits': rate_limit_waits + 1},
+                                 countdown=wait, max_retries=self.request.retries + 1)
+
+            time.sleep(wait)
+            wait = rate_limiter.acquire(region, interactive)
+
+    # Create a copy of kwargs w/o `method` and `priority` to pass to `func`, as modifying
+    # the original `kwargs` breaks task retrying (as would occur if we exceed rate limit, etc).
     non_method_kwargs = kwargs.copy()
     non_method_kwargs.pop('method')
+    non_method_kwargs.pop('priority', None)
+
+    # Retries for errors, not counting the reschedules for the rate limit.
+    max_retries = self.max_retries + rate_limit_waits
 
     # TODO: Cleanup: pass e and self to error handler class/dispatch by mapping
     # errors to dict
     try:
-        result = func(**non_method_kwargs)
+        if static_cache.is_cacheable(func):
+            result = static_cache.get_or_fetch(func, non_method_kwargs,
+                                               riot_watcher.static_get_versions,
+                                               riot_watcher.default_region)
+        else:
+            result = func(**non_method_kwargs)
     except LoLException as e:
         if e == error_400:
             logger.error('400 error')
@@ -106,43 +218,56 @@ def riot_api(self, kwargs):
             if 'Retry-After' in e.headers:
                 retry_after = int(e.headers['Retry-After'])
                 logger.critical('429 error, API rate-limit, retrying in %s sec', retry_after)
+                rate_limiter.block(region, retry_after)
                 try:
-                    raise self.retry(countdown=retry_after)
+                    raise self.retry(countdown=retry_after, max_retries=max_retries)
                 except MaxRetriesExceededError as e:
                     logger.error('Max retries exceeded, %s', e)
             else:
                 logger.error('429 error, non-API rate limit, retrying in %s sec',
                              NON_API_LIMIT_RETRY_DELAY)
                 try:
-                    raise self.retry(countdown=NON_API_LIMIT_RETRY_DELAY)
+                    raise self.retry(countdown=NON_API_LIMIT_RETRY_DELAY, max_retries=max_retries)
                 except MaxRetriesExceededError as e:
                     logger.error('Max retries exceeded, %s', e)
         elif e == error_500:
             logger.error('500 error, retrying in %s sec', RIOT_API_RETRY_DELAY)
             try:
-                raise self.retry()
+                raise self.retry(max_retries=max_retries)
             except MaxRetriesExceededError as e:
                 logger.error('Max retries exceeded, %s', e)
         elif e == error_503:
             logger.error('503 error, retrying in %s sec', RIOT_API_RETRY_DELAY)
             try:
-                raise self.retry()
+                raise self.retry(max_retries=max_retries)
             except MaxRetriesExceededError as e:
                 logger.error('Max retries exceeded, %s', e)
         elif e == error_504:
             logger.error('504 error, retrying in %s sec', RIOT_API_RETRY_DELAY)
             try:
-                raise self.retry()
+                raise self.retry(max_retries=max_retries)
             except MaxRetriesExceededError as e:
                 logger.error('Max retries exceeded, %s', e)
         else:
             logger.exception('Unhandled LoLException (did riotwatcher get updated?) - %s', e)
+            release_claim()
             raise
         result = {}
+    except (ConnectionError, Timeout) as e:
+        logger.error('%s, retrying in %s sec', e, RIOT_API_RETRY_DELAY)
+        try:
+            raise self.retry(max_retries=max_retries)
+        except MaxRetriesExceededError as e:
+            logger.error('Max retries exceeded, %s', e)
+        result = {}
     except Exception as e:
         logger.exception('Unhandled exception! - %s', e)
+        release_claim()
         raise
 
+    if result == {}:
+        release_claim()
+
     return result
 
 
@@ -177,6 +302,8 @@ def store_summoners(result, region):
                 Summoner.objects.create_summoner(region, result[entry])
                 storage_result['created'] += 1
 
+        page_cache.invalidate_summoners(region, result.values())
+
     if storage_result['created'] == 0 and storage_result['updated'] == 0:
         logger.warning('No summoners created or updated!')
     else:
@@ -245,7 +372,10 @@ def store_challenger(result, region):
 
     Replaces the entirety of the challenger league.
     """
-    League.objects.create_or_update_league(result, region)
+    with advisory_lock(League.objects.lock_id(result, region)):
+        League.objects.create_or_update_league(result, region)
+
+    page_cache.invalidate_league_entries(region, result)
 
     logger.info('Stored challenger league for %s', region)
 
@@ -258,25 +388,28 @@ def store_league(result, region):
 
     Stores a previously unknown league or replaces the entirety of the
     summoner's league's entries if it was known.
-    """
-    lock_id = 'store_league'
 
-    with advisory_lock(lock_id) as acquired:
-        # Empty dict means that the queried summoner is not in a league.
-        if result != {}:
-            for summoner_id in result:
-                logger.debug('Reading leagues for summoner ID %s', summoner_id)
+    Each league is stored under its own advisory lock, so different leagues
+    can be stored concurrently.
+    """
+    # Empty dict means that the queried summoner is not in a league.
+    if result != {}:
+        for summoner_id in result:
+            logger.debug('Reading leagues for summoner ID %s', summoner_id)
 
-                for league in result[summoner_id]:
+            for league in result[summoner_id]:
+                with advisory_lock(League.objects.lock_id(league, region)):
                     League.objects.create_or_update_league(league, region)
 
-                # TODO: This is misleading since we can block updates in update_league
-                # based on last_update.
-                logger.info('Stored %s leagues for [%s] %s', len(result[summoner_id]),
-                                                             region, summoner_id)
-            return True
-        else:
-            return False
+                page_cache.invalidate_league_entries(region, league)
+
+            # TODO: This is misleading since we can block updates in update_league
+            # based on last_update.
+            logger.info('Stored %s leagues for [%s] %s', len(result[summoner_id]),
+                                                         region, summoner_id)
+        return True
+    else:
+        return False
 
 @app.task
 def store_match(result):
@@ -287,15 +420,105 @@ def store_match(result):
     Unlike other storage methods, this method reads (match) ID and region from
     the result dict.
 
+    Newly stored matches are folded into the champion stats of existing buckets.
+
     Note: Timeline data not implemented.
     """
     if result != {}:
-        created = MatchDetail.objects.create_match(result)
-        logger.info('Stored match %s (create time: %s)', created, created.match_date())
+        # The match is folded in the transaction that stores it, so a retry after a
+        # failed fold stores and folds it again, instead of finding it stored and
+        # never folding it (or folding it twice).
+        try:
+            with transaction.atomic():
+                created = MatchDetail.objects.create_match(result)
+
+                if created:
+                    ChampionStats.objects.fold_matches([created.id])
+        except Exception:
+            match_claims.release(result['region'], [result['matchId']])
+            raise
+
+        if created:
+            page_cache.invalidate_recent_matches([result])
+            logger.info('Stored match %s (create time: %s)', created, created.match_date())
+
         return True
     else:
         return False
 
+@app.task(base=Batches, flush_every=STORE_MATCH_BATCH_SIZE,
+          flush_interval=STORE_MATCH_BATCH_INTERVAL)
+def store_match_batch(requests):
+    """
+    Batched counterpart of store_match: stores the results of many RiotWatcher
+    get_match calls in one transaction with set-based inserts, then folds the new
+    matches into the champion stats.
+
+    A match that can't be stored is marked as failed without affecting the
+    others; the rest are marked as done with the result store_match would return.
+    If the transaction is aborted by Postgres (e.g. a deadlock or serialization
+    failure), the batch is stored again, up to STORE_MATCH_BATCH_ATTEMPTS times.
+    If the batch fails as a whole otherwise, every request is marked as failed,
+    so nothing waiting on them is left pending.
+
+    Batch tasks don't run eagerly, see store_match_task.
+    """
+    results = [request.args[0] for request in requests]
+    matches = [result for result in results if result != {}]
+
+    for attempt in range(1, STORE_MATCH_BATCH_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                created, failed = MatchDetail.objects.bulk_create_matches_isolated(matches)
+
+                if created:
+                    ChampionStats.objects.fold_matches(created)
+
+            break
+        except Exception as e:
+            if isinstance(e, OperationalError) and attempt < STORE_MATCH_BATCH_ATTEMPTS:
+                logger.warning('Storing batch of %s matches was aborted (attempt %s), '
+                               'retrying: %s', len(requests), attempt, e)
+                time.sleep(STORE_MATCH_BATCH_RETRY_DELAY * attempt)
+                continue
+
+            logger.exception('Failed to store batch of %s matches', len(requests))
+
+            for match in matches:
+                match_claims.release(match['region'], [match['matchId']])
+
+            for request in requests:
+                app.backend.mark_as_failure(request.id, e)
+
+            return
+
+    page_cache.invalidate_recent_matches(
+        [match for match in matches if (match['matchId'], match['region']) not in failed])
+
+    for request, result in zip(requests, results):
+        key = (result.get('matchId'), result.get('region'))
+
+        if key in failed:
+            match_claims.release(result['region'], [result['matchId']])
+            app.backend.mark_as_failure(request.id, failed[key])
+        else:
+            app.backend.mark_as_done(request.id, result != {})
+
+    logger.info('Stored %s of %s matches in batch (%s failed)',
+                len(created), len(requests), len(failed))
+
+
+def store_match_task():
+    """
+    Returns the task to store get_match results with: store_match_batch, or
+    store_match when tasks are run eagerly (e.g. in tests).
+    """
+    if app.conf.CELERY_ALWAYS_EAGER:
+        return store_match
+    else:
+        return store_match_batch
+
+
 @app.task
 def store_item_match_list(result):
     """
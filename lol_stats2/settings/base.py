@@ -13,6 +13,7 @@ import os
 
 from kombu import Queue
 
+from riot_api.routing import REGION_QUEUE_NAMES
 from .secrets import DJANGO_SECRET_KEY, PG_USER, PG_PASS
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -56,12 +57,32 @@ REST_FRAMEWORK = {
 
 CELERYD_POOL_RESTARTS = True
 
+# Also used as Celery's result backend, see lol_stats2/celery.py.
+REDIS_URL = 'redis://localhost:6379/0'
+
+# (allowed requests, seconds) per API key and region, see riot_api.ratelimit.
+# For a production key, use ((3000, 10), (180000, 600)).
+RIOT_API_RATE_LIMITS = ((10, 10), (500, 600))
+
+# The share of each rate limit window that crawls can't use, so that requests made
+# for users (see riot_api.routing) are admitted even while crawls are running.
+RIOT_API_INTERACTIVE_SHARE = 0.3
+
+# Max keep-alive connections per Riot API host, per worker process.
+RIOT_API_POOL_SIZE = 10
+
+# Seconds, or (connect, read) seconds.
+RIOT_API_TIMEOUT = (3.05, 10)
+
+# Modules with tasks that aren't found by autodiscovery (i.e. not in <app>.tasks).
+CELERY_IMPORTS = ('riot_api.wrapper', 'cache.summoners')
+
 # TODO: Refine MQ topology.
 CELERY_QUEUES = (
     Queue('default', routing_key='default'),
     Queue('match_ids', routing_key='match_ids'),
     Queue('store', routing_key='store.#'),
-)
+) + tuple(Queue(name, routing_key=name) for name in REGION_QUEUE_NAMES)
 
 CELERY_DEFAULT_QUEUE = 'default'
 CELERY_DEFAULT_EXCHANGE = 'default'
@@ -69,20 +90,26 @@ CELERY_DEFAULT_EXCHANGE_TYPE = 'topic'
 CELERY_DEFAULT_ROUTING_KEY = 'task.default'
 
 # TODO: Consolidate routing rules.
-CELERY_ROUTES = {
+CELERY_ROUTES = ({
     'lol_stats2.celery.store_match': {
         'queue': 'store',
         'exchange': 'default',
         'exchange_type': 'topic',
         'routing_key': 'store.get_match',
     },
+    'lol_stats2.celery.store_match_batch': {
+        'queue': 'store',
+        'exchange': 'default',
+        'exchange_type': 'topic',
+        'routing_key': 'store.get_match_batch',
+    },
     'riot_api.wrapper.get_matches_from_ids': {
         'queue': 'match_ids',
         'exchange': 'default',
         'exchange_type': 'topic',
         'routing_key': 'match_ids',
     }
-}
+}, 'riot_api.routing.RegionRouter')
 
 # This should be set in test virtualenv.
 # Causes all tasks to be executed locally by blocking until task returns.
@@ -0,0 +1,158 @@
+"""
+A Bloom filter of the IDs of stored matches, per region, kept in Redis.
+
+Checking whether a match is stored then usually doesn't touch the DB: a match the
+filter doesn't contain is certainly not stored, and only the (few) matches it does
+contain need to be checked against the DB. It has no false negatives as long as
+every stored match is added to it, which the match creation paths do.
+
+A region's filter is built from the matches table when a worker starts if it
+doesn't exist yet (see lol_stats2.celery), or on demand with the
+rebuild_match_filter command. Until it exists, every match is reported as possibly
+stored, i.e. callers fall back to the DB.
+"""
+
+import hashlib
+import logging
+
+from django.apps import apps
+from django.db.models import Max
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 2^27 bits (16 MB) and 7 hashes per region keep the false positive rate around
+# 1% up to about 14 million matches per region.
+MATCH_FILTER_BITS = 2 ** 27
+MATCH_FILTER_HASHES = 7
+
+# How many match IDs are added per Redis round trip when rebuilding.
+_REBUILD_CHUNK_SIZE = 10000
+
+# Upper bound for how long a rebuild may take before another worker may start one.
+_REBUILD_LOCK_TTL = 60 * 60
+
+
+class MatchIdFilter:
+    def __init__(self, client=None, prefix='bloom:match', bits=MATCH_FILTER_BITS,
+                 hashes=MATCH_FILTER_HASHES):
+        self.client = client if client is not None else get_redis()
+        self.prefix = prefix
+        self.bits = bits
+        self.hashes = hashes
+
+    def _key(self, region):
+        return '{}:{}'.format(self.prefix, region.upper())
+
+    def _offsets(self, match_id):
+        # Double hashing: the i-th hash is h1 + i * h2.
+        digest = hashlib.md5(str(match_id).encode()).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little')
+
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _set_bits(self, key, match_ids):
+        pipe = self.client.pipeline(transaction=False)
+
+        for match_id in match_ids:
+            for offset in self._offsets(match_id):
+                pipe.setbit(key, offset, 1)
+
+        pipe.execute()
+
+    def add(self, region, match_ids):
+        """
+        Adds match IDs of `region`, if its filter exists.
+        """
+        key = self._key(region)
+        match_ids = list(match_ids)
+
+        if match_ids and self.client.exists(key):
+            self._set_bits(key, match_ids)
+
+    def might_contain(self, region, match_ids):
+        """
+        Returns the subset of match IDs of `region` that may be stored.
+        The rest certainly aren't.
+        """
+        key = self._key(region)
+        match_ids = list(match_ids)
+
+        if not match_ids or not self.client.exists(key):
+            return set(match_ids)
+
+        pipe = self.client.pipeline(transaction=False)
+
+        for match_id in match_ids:
+            for offset in self._offsets(match_id):
+                pipe.getbit(key, offset)
+
+        bits = pipe.execute()
+
+        return {match_id for i, match_id in enumerate(match_ids)
+                if all(bits[i * self.hashes:(i + 1) * self.hashes])}
+
+    def rebuild(self, region):
+        """
+        Builds the filter of `region` from the matches table, replacing the current one.
+
+        The result can miss matches, e.g. ones whose transaction commits after their
+        chunk was read, or ones added to the current filter while this runs, so the
+        filter must only be used to skip lookups, never to decide a match is new.
+        """
+        MatchDetail = apps.get_model('matches', 'MatchDetail')
+        region = region.upper()
+        key = self._key(region)
+        tmp_key = key + ':rebuild'
+        matches = MatchDetail.objects.filter(region=region)
+
+        # Matches stored while the filter is being built are added afterwards.
+        max_pk = MatchDetail.objects.aggregate(Max('id'))['id__max'] or 0
+        last_pk = 0
+        count = 0
+
+        self.client.delete(tmp_key)
+        self.client.setbit(tmp_key, self.bits - 1, 0)
+
+        # Read in chunks by primary key, so the table is never loaded at once.
+        while True:
+            chunk = list(matches.filter(id__gt=last_pk, id__lte=max_pk)
+                                .order_by('id')
+                                .values_list('id', 'match_id')[:_REBUILD_CHUNK_SIZE])
+
+            if not chunk:
+                break
+
+            self._set_bits(tmp_key, [match_id for pk, match_id in chunk])
+            last_pk = chunk[-1][0]
+            count += len(chunk)
+
+        self.client.rename(tmp_key, key)
+        self.add(region, matches.filter(id__gt=max_pk).values_list('match_id', flat=True))
+
+        logger.info('Rebuilt match filter for {} with {} matches'.format(region, count))
+
+    def rebuild_missing(self):
+        """
+        Builds the filters of the regions that have stored matches but no filter.
+        A region is only built by one process at a time.
+        """
+        MatchDetail = apps.get_model('matches', 'MatchDetail')
+        regions = MatchDetail.objects.order_by().values_list('region', flat=True).distinct()
+
+        for region in regions:
+            lock_key = self._key(region) + ':lock'
+
+            if self.client.exists(self._key(region)) or \
+               not self.client.set(lock_key, 1, ex=_REBUILD_LOCK_TTL, nx=True):
+                continue
+
+            try:
+                self.rebuild(region)
+            finally:
+                self.client.delete(lock_key)
+
+
+match_filter = MatchIdFilter()
@@ -0,0 +1,332 @@
+import io
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from matches.models import (MatchDetail,
+                            Participant,
+                            ParticipantIdentity,
+                            ParticipantTimeline,
+                            Mastery,
+                            Rune,
+                            Team,
+                            BannedChampion,
+                            SummonerMatch)
+from matches.bloom import match_filter
+from summoners.models import Summoner
+from utils.db import table, column
+from utils.functions import standardize_name
+
+# Natural keys used to join staged child rows to the primary keys of their
+# newly inserted parents.
+_MATCH_KEY = [('key_match_id', 'bigint'), ('key_region', 'varchar(4)')]
+_PARTICIPANT_KEY = _MATCH_KEY + [('key_participant_id', 'integer')]
+_TEAM_KEY = _MATCH_KEY + [('key_team_id', 'integer')]
+_PLAYER = [('key_summoner_id', 'bigint'),
+           ('key_summoner_region', 'varchar(4)'),
+           ('summoner_name', 'varchar(24)'),
+           ('std_name', 'varchar(24)'),
+           ('profile_icon_id', 'integer')]
+
+
+def _copy_value(value):
+    """
+    Formats a value for COPY's text format.
+    """
+    if value is None:
+        return '\\N'
+
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t') \
+                     .replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _Stage:
+    """
+    A temporary table that rows of a model (plus some natural key columns) are
+    copied into before being inserted into the model's table.
+    """
+    def __init__(self, name, model, fields, extra_columns):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.extra_columns = extra_columns
+        self.rows = []
+
+    def columns(self, alias=None):
+        prefix = '{}.'.format(alias) if alias else ''
+        return ', '.join(prefix + column(self.model, f) for f in self.fields)
+
+    def create(self, cursor):
+        extra = ''.join(', NULL::{} AS {}'.format(col_type, name)
+                        for name, col_type in self.extra_columns)
+        cursor.execute('CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {}{} FROM {} WITH NO DATA'
+                       .format(self.name, self.columns(), extra, table(self.model)))
+
+    def copy(self, cursor):
+        buf = io.StringIO()
+
+        for row in self.rows:
+            buf.write('\t'.join(map(_copy_value, row)))
+            buf.write('\n')
+
+        buf.seek(0)
+        cursor.copy_expert('COPY {} FROM STDIN'.format(self.name), buf)
+
+
+class Command(BaseCommand):
+    help = ('Load a newline-delimited JSON dump of match responses (as returned by '
+            'RiotWatcher.get_match) into the matches tables using COPY. Matches '
+            'already stored are skipped. Champion stats are not updated; rerun the '
+            'aggregate command afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path',
+                            help='The dump to load, or - to read from stdin')
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=2000,
+                            help='The number of matches to load per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        start = time.time()
+        read = 0
+        loaded = 0
+
+        if options['path'] == '-':
+            dump = sys.stdin
+        else:
+            dump = open(options['path'], 'r')
+
+        try:
+            for batch in self._batches(dump, options['batch_size']):
+                read += len(batch)
+                loaded += self._load_batch(batch)
+                self.stdout.write('Loaded {} of {} matches read ({:.1f}s)'.format(
+                    loaded, read, time.time() - start))
+        finally:
+            if dump is not sys.stdin:
+                dump.close()
+
+        self.stdout.write(self.style.MIGRATE_SUCCESS('Done!'))
+
+    @staticmethod
+    def _batches(dump, batch_size):
+        """
+        Yields lists of up to batch_size match dicts, without repeats within a list.
+        """
+        batch = {}
+
+        for line in dump:
+            if not line.strip():
+                continue
+
+            attrs = json.loads(line)
+            batch.setdefault((attrs['matchId'], attrs['region']), attrs)
+
+            if len(batch) == batch_size:
+                yield list(batch.values())
+                batch = {}
+
+        if batch:
+            yield list(batch.values())
+
+    @staticmethod
+    def _stages():
+        return {
+            'match': _Stage('load_match', MatchDetail, list(MatchDetail.data_fields()), []),
+            'participant': _Stage('load_participant', Participant,
+                                  list(Participant.data_fields()), _MATCH_KEY),
+            'timeline': _Stage('load_timeline', ParticipantTimeline,
+                               list(ParticipantTimeline.data_fields()), _PARTICIPANT_KEY),
+            'mastery': _Stage('load_mastery', Mastery, list(Mastery.data_fields()),
+                              _PARTICIPANT_KEY),
+            'rune': _Stage('load_rune', Rune, list(Rune.data_fields()), _PARTICIPANT_KEY),
+            'identity': _Stage('load_identity', ParticipantIdentity,
+                               list(ParticipantIdentity.data_fields()), _MATCH_KEY + _PLAYER),
+            'team': _Stage('load_team', Team, list(Team.data_fields()), _MATCH_KEY),
+            'ban': _Stage('load_ban', BannedChampion, list(BannedChampion.data_fields()),
+                          _TEAM_KEY),
+        }
+
+    @staticmethod
+    def _stage_match(stages, attrs):
+        """
+        Normalizes a match dict into rows of the staging tables.
+        """
+        def row(stage, model_attrs, key):
+            init_dict = stage.model.objects.init_dict(model_attrs)
+            stage.rows.append([init_dict[f] for f in stage.fields] + key)
+
+        match_key = [attrs['matchId'], attrs['region']]
+
+        init_dict = MatchDetail.objects._match_init_dict(attrs)
+        stages['match'].rows.append([init_dict[f] for f in stages['match'].fields])
+
+        for p in attrs['participants']:
+            participant_key = match_key + [p['participantId']]
+
+            row(stages['participant'], p, match_key)
+            row(stages['timeline'], p['timeline'], participant_key)
+
+            for mastery in p.get('masteries', []):
+                row(stages['mastery'], mastery, participant_key)
+
+            for rune in p.get('runes', []):
+                row(stages['rune'], rune, participant_key)
+
+        for pi in attrs['participantIdentities']:
+            player = pi['player']
+            row(stages['identity'], pi, match_key + [player['summonerId'],
+                                                     attrs['region'].upper(),
+                                                     player['summonerName'],
+                                                     standardize_name(player['summonerName']),
+                                                     player['profileIcon']])
+
+        for team in attrs['teams']:
+            row(stages['team'], team, match_key)
+
+            for ban in team.get('bans', []):
+                row(stages['ban'], ban, match_key + [team['teamId']])
+
+    def _load_batch(self, batch):
+        """
+        Copies a batch of matches into staging tables and moves the ones that
+        aren't already stored into the matches tables.
+
+        Returns the number of matches loaded.
+        """
+        stages = self._stages()
+
+        for attrs in batch:
+            self._stage_match(stages, attrs)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for stage in stages.values():
+                stage.create(cursor)
+                stage.copy(cursor)
+
+            cursor.execute('CREATE TEMP TABLE load_new_match '
+                           '(id integer, match_id bigint, region varchar(4)) ON COMMIT DROP')
+            cursor.execute('CREATE TEMP TABLE load_new_participant '
+                           '(id integer, match_detail_id integer, participant_id integer) '
+                           'ON COMMIT DROP')
+            cursor.execute('CREATE TEMP TABLE load_new_team '
+                           '(id integer, match_detail_id integer, team_id integer) ON COMMIT DROP')
+
+            self._insert_matches(cursor, stages['match'])
+            self._insert_participants(cursor, stages['participant'])
+
+            for name in ('timeline', 'mastery', 'rune'):
+                self._insert_participant_children(cursor, stages[name])
+
+            self._insert_summoners(cursor)
+            self._insert_identities(cursor, stages['identity'])
+            self._insert_teams(cursor, stages['team'])
+            self._insert_bans(cursor, stages['ban'])
+
+            cursor.execute('SELECT id, match_id, region FROM load_new_match')
+            loaded = cursor.fetchall()
+
+            SummonerMatch.objects.index_matches([pk for pk, match_id, region in loaded])
+
+            # Dropped on commit too, but not if this runs within a transaction.
+            cursor.execute('DROP TABLE {}, load_new_match, load_new_participant, load_new_team'
+                           .format(', '.join(stage.name for stage in stages.values())))
+
+        for region in set(region for pk, match_id, region in loaded):
+            match_filter.add(region, [match_id for pk, match_id, r in loaded if r == region])
+
+        return len(loaded)
+
+    @staticmethod
+    def _insert_matches(cursor, stage):
+        cursor.execute('''
+            WITH created AS (
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM load_match l
+                WHERE NOT EXISTS (SELECT 1 FROM {table} m
+                                  WHERE m.match_id = l.match_id AND m.region = l.region)
+                ON CONFLICT (match_id, region) DO NOTHING
+                RETURNING id, match_id, region
+            )
+            INSERT INTO load_new_match SELECT id, match_id, region FROM created
+        '''.format(table=table(MatchDetail), columns=stage.columns()))
+
+    @staticmethod
+    def _insert_participants(cursor, stage):
+        cursor.execute('''
+            WITH created AS (
+                INSERT INTO {table} ({columns}, match_detail_id)
+                SELECT {aliased_columns}, n.id FROM load_participant l
+                JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+                RETURNING id, match_detail_id, participant_id
+            )
+            INSERT INTO load_new_participant SELECT id, match_detail_id, participant_id FROM created
+        '''.format(table=table(Participant), columns=stage.columns(),
+                   aliased_columns=stage.columns('l')))
+
+    @staticmethod
+    def _insert_participant_children(cursor, stage):
+        cursor.execute('''
+            INSERT INTO {table} ({columns}, participant_id)
+            SELECT {aliased_columns}, p.id FROM {stage} l
+            JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+            JOIN load_new_participant p ON p.match_detail_id = n.id
+                                       AND p.participant_id = l.key_participant_id
+        '''.format(table=table(stage.model), columns=stage.columns(),
+                   aliased_columns=stage.columns('l'), stage=stage.name))
+
+    @staticmethod
+    def _insert_summoners(cursor):
+        """
+        Creates the summoners that aren't known yet. Known summoners are left as
+        they are, since a dump is likely to be older than what is stored.
+        """
+        cursor.execute('''
+            INSERT INTO {table} (summoner_id, region, name, std_name, profile_icon_id, last_update)
+            SELECT DISTINCT ON (l.key_summoner_id, l.key_summoner_region)
+                   l.key_summoner_id, l.key_summoner_region, l.summoner_name, l.std_name,
+                   l.profile_icon_id, now()
+            FROM load_identity l
+            JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+            ON CONFLICT (summoner_id, region) DO NOTHING
+        '''.format(table=table(Summoner)))
+
+    @staticmethod
+    def _insert_identities(cursor, stage):
+        cursor.execute('''
+            INSERT INTO {table} ({columns}, match_detail_id, summoner_id)
+            SELECT {aliased_columns}, n.id, s.id FROM load_identity l
+            JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+            LEFT JOIN {summoner_table} s ON s.summoner_id = l.key_summoner_id
+                                        AND s.region = l.key_summoner_region
+        '''.format(table=table(ParticipantIdentity), columns=stage.columns(),
+                   aliased_columns=stage.columns('l'), summoner_table=table(Summoner)))
+
+    @staticmethod
+    def _insert_teams(cursor, stage):
+        cursor.execute('''
+            WITH created AS (
+                INSERT INTO {table} ({columns}, match_detail_id)
+                SELECT {aliased_columns}, n.id FROM load_team l
+                JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+                RETURNING id, match_detail_id, team_id
+            )
+            INSERT INTO load_new_team SELECT id, match_detail_id, team_id FROM created
+        '''.format(table=table(Team), columns=stage.columns(), aliased_columns=stage.columns('l')))
+
+    @staticmethod
+    def _insert_bans(cursor, stage):
+        cursor.execute('''
+            INSERT INTO {table} ({columns}, team_id)
+            SELECT {aliased_columns}, t.id FROM load_ban l
+            JOIN load_new_match n ON n.match_id = l.key_match_id AND n.region = l.key_region
+            JOIN load_new_team t ON t.match_detail_id = n.id AND t.team_id = l.key_team_id
+        '''.format(table=table(BannedChampion), columns=stage.columns(),
+                   aliased_columns=stage.columns('l')))
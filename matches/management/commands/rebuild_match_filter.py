@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from matches.bloom import match_filter
+from matches.models import MatchDetail
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Bloom filters of stored match IDs from the matches table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--region',
+                            action='append',
+                            help='The region to rebuild (may be repeated), default is all')
+
+    def handle(self, *args, **options):
+        regions = options['region'] or \
+            MatchDetail.objects.order_by().values_list('region', flat=True).distinct()
+
+        for region in regions:
+            self.stdout.write('Rebuilding {}...'.format(region))
+            match_filter.rebuild(region)
+
+        self.stdout.write(self.style.MIGRATE_SUCCESS('Done!'))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# Indexes the matches already stored, see SummonerMatchManager.index_matches.
+BACKFILL_SQL = '''
+    INSERT INTO matches_summonermatch (summoner_id, match_detail_id, match_creation, match_id,
+                                       champion_id, winner, kda)
+    SELECT pi.summoner_id, m.id, m.match_creation, m.match_id, p.champion_id, p.winner,
+           (coalesce(p.kills, 0) + coalesce(p.assists, 0))::double precision
+           / greatest(coalesce(p.deaths, 0), 1)
+    FROM matches_matchdetail m
+    JOIN matches_participantidentity pi ON pi.match_detail_id = m.id
+    JOIN matches_participant p ON p.match_detail_id = m.id
+                               AND p.participant_id = pi.participant_id
+    WHERE pi.summoner_id IS NOT NULL
+    ON CONFLICT (summoner_id, match_detail_id) DO NOTHING
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('summoners', '0010_auto_20151204_0735'),
+        ('matches', '0012_matchdetail_avg_highest_achieved_season_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummonerMatch',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('match_creation', models.BigIntegerField()),
+                ('match_id', models.BigIntegerField()),
+                ('champion_id', models.IntegerField()),
+                ('winner', models.BooleanField()),
+                ('kda', models.FloatField()),
+                ('match_detail', models.ForeignKey(to='matches.MatchDetail')),
+                ('summoner', models.ForeignKey(to='summoners.Summoner', db_index=False)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='summonermatch',
+            unique_together=set([('summoner', 'match_detail')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='summonermatch',
+            index_together=set([('summoner', 'match_creation', 'match_detail')]),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
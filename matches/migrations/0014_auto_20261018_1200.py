@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0013_summonermatch'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='matchdetail',
+            index_together=set([('match_creation', 'id')]),
+        ),
+    ]
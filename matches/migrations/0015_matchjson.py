@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0014_auto_20261018_1200'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchJSON',
+            fields=[
+                ('match_detail', models.OneToOneField(serialize=False, primary_key=True, to='matches.MatchDetail')),
+                ('version', models.SmallIntegerField()),
+                ('json', models.TextField()),
+            ],
+        ),
+    ]
@@ -10,16 +10,20 @@ to by more than one kind of other model (e.g. Position).
 """
 
 import logging
+from collections import OrderedDict
 from datetime import datetime
 from statistics import mean
 
-from django.db import models, transaction
+from django.db import models, transaction, connection, IntegrityError
+from django.db.models import F
 from django.contrib.postgres import fields
 
 from utils.mixins import (IterableDataFieldsMixin,
                           CreateableFromAttrsMixin,
                           ParticipantFromAttrsMixin)
 from utils.constants import TIER_ENUM
+from utils.db import bulk_insert, table
+from matches.bloom import match_filter
 from champions.models import Champion
 from summoners.models import Summoner
 
@@ -37,31 +41,161 @@ class MatchDetailManager(CreateableFromAttrsMixin, models.Manager):
 
         return mean(map(TIER_ENUM.get, tiers))
 
+    def _match_init_dict(self, attrs):
+        attrs.update({'avg_highest_achieved_season_tier': MatchDetailManager._get_avg_tier(attrs)})
+
+        return self.init_dict(attrs)
+
     def create_match(self, attrs):
         match = None
 
-        with transaction.atomic():
-            if not self.filter(match_id=attrs['matchId'],
-                               region=attrs['region']).exists():
-
-                attrs.update({'avg_highest_achieved_season_tier': MatchDetailManager._get_avg_tier(attrs)})
-                match = self.create(**self.init_dict(attrs))
+        try:
+            with transaction.atomic():
+                # Only matches that may be stored (per the filter) need to be looked up.
+                if not match_filter.might_contain(attrs['region'], [attrs['matchId']]) or \
+                   not self.filter(match_id=attrs['matchId'], region=attrs['region']).exists():
+                    match = self.create(**self._match_init_dict(attrs))
+        except IntegrityError:
+            # The filter is only advisory, it can miss a stored match (see
+            # MatchIdFilter.rebuild), in which case the unique constraint catches it.
+            logger.info('Match already stored: [{}] {}'.format(attrs['region'], attrs['matchId']))
+            return None
 
         if match:
-            for p in attrs['participants']:
-                match.participant_set.create_participant(p)
-
-            # See bulk_create_participants
-            # match.participant_set.bulk_create_participants(attrs['participants'])
+            match_filter.add(attrs['region'], [attrs['matchId']])
+            match.participant_set.bulk_create_participants(attrs['participants'])
             match.participantidentity_set.bulk_create_participant_identities(attrs['participantIdentities'])
             match.team_set.bulk_create_teams(attrs['teams'])
+            SummonerMatch.objects.index_matches([match.id])
 
         logger.info('Created match: [{}] {}'.format(attrs['region'], attrs['matchId']))
         return match
 
+    def filter_known(self, keys):
+        """
+        Accepts an iterable of (match ID, region) tuples and returns a list of
+        those whose matches are stored.
+
+        Only the matches that the match filter (see matches.bloom) reports as
+        possibly stored are looked up.
+        """
+        by_region = {}
+
+        for match_id, region in keys:
+            by_region.setdefault(region, []).append(match_id)
+
+        known = []
+
+        for region, match_ids in by_region.items():
+            candidates = match_filter.might_contain(region, match_ids)
+
+            if candidates:
+                known.extend(self.filter(match_id__in=candidates, region=region)
+                             .values_list('match_id', 'region'))
+
+        return known
+
+    def bulk_create_matches(self, matches):
+        """
+        Accepts a list of match dicts (as returned by RiotWatcher.get_match) and stores
+        the ones that aren't already stored along with all of their related models.
+
+        Each model's rows are inserted for the whole batch at once, so the number of
+        statements doesn't depend on the number of matches. Primary keys generated by
+        the inserts are read back via RETURNING and used for the child rows' FKs.
+
+        Returns a list of the primary keys of the created MatchDetails.
+        """
+        unique_matches = OrderedDict()
+
+        for attrs in matches:
+            unique_matches.setdefault((attrs['matchId'], attrs['region']), attrs)
+
+        known = set(self.filter_known(unique_matches))
+        to_create = [attrs for key, attrs in unique_matches.items() if key not in known]
+
+        if not to_create:
+            return []
+
+        fields = list(MatchDetail.data_fields())
+        rows = []
+
+        for attrs in to_create:
+            init_dict = self._match_init_dict(attrs)
+            rows.append([init_dict[f] for f in fields])
+
+        with transaction.atomic():
+            # Matches stored concurrently since the above check are skipped.
+            created = bulk_insert(MatchDetail, fields, rows,
+                                  on_conflict='ON CONFLICT (match_id, region) DO NOTHING',
+                                  returning=['id', 'match_id', 'region'])
+            created = [(pk, unique_matches[(match_id, region)])
+                       for pk, match_id, region in created]
+
+            Participant.objects.bulk_create_participant_sets(
+                [(pk, p) for pk, attrs in created for p in attrs['participants']])
+            ParticipantIdentity.objects.bulk_create_participant_identity_sets(
+                [(pk, attrs['region'], pi) for pk, attrs in created
+                 for pi in attrs['participantIdentities']])
+            Team.objects.bulk_create_team_sets(
+                [(pk, t) for pk, attrs in created for t in attrs['teams']])
+            SummonerMatch.objects.index_matches([pk for pk, attrs in created])
+
+            for region in set(attrs['region'] for pk, attrs in created):
+                match_filter.add(region, [attrs['matchId'] for pk, attrs in created
+                                          if attrs['region'] == region])
+
+        logger.info('Bulk created {} of {} matches'.format(len(created), len(matches)))
+        return [pk for pk, attrs in created]
+
+    def bulk_create_matches_isolated(self, matches):
+        """
+        Like bulk_create_matches, but a match that can't be stored doesn't keep the
+        others from being stored: if storing them all at once fails, each match is
+        stored on its own (in its own savepoint).
+
+        Returns a 2-tuple of a list of the primary keys of the created MatchDetails
+        and a dict of {(match ID, region): exception} of the matches that failed.
+        """
+        try:
+            with transaction.atomic():
+                return self.bulk_create_matches(matches), {}
+        except Exception as e:
+            logger.warning('Bulk create of {} matches failed, storing them one at a time: {}'
+                           .format(len(matches), e))
+
+        created = []
+        failed = {}
+
+        for attrs in matches:
+            try:
+                with transaction.atomic():
+                    created.extend(self.bulk_create_matches([attrs]))
+            except Exception as e:
+                logger.exception('Failed to store match [{}] {}'.format(attrs.get('region'),
+                                                                       attrs.get('matchId')))
+                failed[(attrs.get('matchId'), attrs.get('region'))] = e
+
+        return created, failed
+
     def by_version(self, version):
         return self.filter(match_version__startswith=version)
 
+    def for_summoner(self, summoner_pk):
+        """
+        Returns a QuerySet of the matches of the summoner with the given primary key,
+        in reverse chronological order.
+
+        Goes through SummonerMatch, so only the summoner's rows of its index are read.
+        Its ordering columns are annotated as `summoner_match_creation` and
+        `summoner_match_detail`, so they can be paginated by (see
+        matches.views.SummonerMatchResultsSetPagination).
+        """
+        return self.filter(summonermatch__summoner_id=summoner_pk)\
+            .annotate(summoner_match_creation=F('summonermatch__match_creation'),
+                      summoner_match_detail=F('summonermatch__match_detail'))\
+            .order_by('-summoner_match_creation', '-summoner_match_detail')
+
 
 class MatchDetail(IterableDataFieldsMixin, models.Model):
     map_id = models.IntegerField()                      # ex. 11
@@ -87,9 +221,58 @@ class MatchDetail(IterableDataFieldsMixin, models.Model):
 
     class Meta:
         unique_together = ('match_id', 'region')
+        index_together = ('match_creation', 'id')
         get_latest_by = 'match_creation'
 
 
+class MatchJSONManager(models.Manager):
+    def get_or_render(self, match_detail_ids, render):
+        """
+        Accepts a list of MatchDetail primary keys and a function that renders a list
+        of them, returning a dict of {primary key: JSON}
+        (see matches.serializers.render_matches).
+
+        Returns a dict of {primary key: JSON} of the matches. Only the matches without a
+        current rendering are rendered, and their renderings are stored.
+        """
+        blobs = dict(self.filter(match_detail_id__in=match_detail_ids, version=MatchJSON.VERSION)
+                     .values_list('match_detail_id', 'json'))
+        missing = [pk for pk in match_detail_ids if pk not in blobs]
+
+        if missing:
+            rendered = render(missing)
+            bulk_insert(MatchJSON, ['match_detail', 'version', 'json'],
+                        [(pk, MatchJSON.VERSION, blob) for pk, blob in rendered.items()],
+                        on_conflict='ON CONFLICT (match_detail_id) DO UPDATE '
+                                    'SET version = EXCLUDED.version, json = EXCLUDED.json')
+            blobs.update(rendered)
+            logger.debug('Rendered {} of {} matches'.format(len(rendered), len(match_detail_ids)))
+
+        return blobs
+
+
+class MatchJSON(models.Model):
+    """
+    The JSON of a match as served by the match API (see matches.views).
+
+    Stored matches don't change, so each is serialized once, on first read, instead of
+    on every request. Bump VERSION when the output of MatchDetailSerializer changes;
+    renderings of older versions are replaced as they are read.
+
+    Note that participants' summoner names are as of the rendering.
+    """
+    VERSION = 1
+
+    match_detail = models.OneToOneField(MatchDetail, primary_key=True)
+    version = models.SmallIntegerField()
+    json = models.TextField()
+
+    objects = MatchJSONManager()
+
+    def __str__(self):
+        return 'JSON of {}'.format(self.match_detail_id)
+
+
 class ParticipantManager(ParticipantFromAttrsMixin, models.Manager):
     def create_participant(self, attrs):
         participant = self.create(**self.init_dict(attrs))
@@ -104,12 +287,66 @@ class ParticipantManager(ParticipantFromAttrsMixin, models.Manager):
 
         return participant
 
-    # TODO: Participant creation involves creating mastery and rune sets, which in turn
-    # need a participant_id to associate themselves with, which isn't created until the
-    # Participant object is saved, so we can't bulk create these in the same way as the
-    # other models.
-    # def bulk_create_participants(self, participants):
-    #     pass
+    def bulk_create_participant_sets(self, participants):
+        """
+        Accepts a list of (match_detail_id, attrs) tuples, where attrs is a Participant
+        DTO including its stats, timeline, masteries and runes.
+
+        Bulk inserts the Participants, reading their IDs back via RETURNING,
+        then bulk inserts their ParticipantTimelines, Masteries and Runes.
+
+        Returns a list of the created Participants' primary keys.
+        """
+        if not participants:
+            return []
+
+        fields = list(Participant.data_fields())
+        rows = []
+
+        for match_detail_id, attrs in participants:
+            init_dict = self.init_dict(attrs)
+            rows.append([init_dict[f] for f in fields] + [match_detail_id])
+
+        created = bulk_insert(Participant, fields + ['match_detail_id'], rows,
+                              returning=['id', 'match_detail_id', 'participant_id'])
+        pks = {(match_detail_id, participant_id): pk
+               for pk, match_detail_id, participant_id in created}
+
+        timeline_objs = []
+        mastery_objs = []
+        rune_objs = []
+
+        for match_detail_id, attrs in participants:
+            pk = pks[(match_detail_id, attrs['participantId'])]
+
+            timeline = ParticipantTimeline(**ParticipantTimeline.objects.init_dict(attrs['timeline']))
+            timeline.participant_id = pk
+            timeline_objs.append(timeline)
+
+            for kwargs in attrs.get('masteries', []):
+                mastery = Mastery(**Mastery.objects.init_dict(kwargs))
+                mastery.participant_id = pk
+                mastery_objs.append(mastery)
+
+            for kwargs in attrs.get('runes', []):
+                rune = Rune(**Rune.objects.init_dict(kwargs))
+                rune.participant_id = pk
+                rune_objs.append(rune)
+
+        ParticipantTimeline.objects.bulk_create(timeline_objs)
+        Mastery.objects.bulk_create(mastery_objs)
+        Rune.objects.bulk_create(rune_objs)
+
+        logger.debug('Bulk created {} participants'.format(len(created)))
+        return list(pks.values())
+
+    def bulk_create_participants(self, participants):
+        """
+        Accepts a list of Participant DTOs and bulk inserts them, along with their
+        timelines, masteries and runes, for the MatchDetail this manager is related to.
+        """
+        return self.bulk_create_participant_sets([(self.instance.id, attrs)
+                                                  for attrs in participants])
 
 
 class Participant(IterableDataFieldsMixin, models.Model):
@@ -206,31 +443,39 @@ class ParticipantIdentityManager(CreateableFromAttrsMixin, models.Manager):
 
         return participant_identity
 
-    def bulk_create_participant_identities(self, participant_identities):
+    def bulk_create_participant_identity_sets(self, participant_identities):
         """
-        Accepts a list of kwargs for participant identities in snakeCase, creates
-        ParticipantIdentity objects based on the kwargs, associates the summoner FK of each
-        with a Summoner object that is created or updated based on the inner `player` dict in
-        each participant identity dict, and then bulk inserts all of the ParticipantIdentity
-        objects.
+        Accepts a list of (match_detail_id, region, kwargs) tuples, where kwargs are for
+        a participant identity in snakeCase, creates ParticipantIdentity objects based on
+        the kwargs, associates the summoner FK of each with a Summoner object that is
+        created or updated based on the inner `player` dict in each participant identity
+        dict, and then bulk inserts all of the ParticipantIdentity objects.
+
+        The summoners of all of the participant identities are upserted at once.
         """
+        summoners = Summoner.objects.bulk_create_or_update_summoners_from_match(
+            [(region, kwargs['player']) for _, region, kwargs in participant_identities])
         pi_objs = []
-        player_kwargs = []
 
-        for kwargs in participant_identities:
+        for match_detail_id, region, kwargs in participant_identities:
             pi_obj = ParticipantIdentity(**self.init_dict(kwargs))
-            pi_obj.match_detail_id = self.instance.id
+            pi_obj.match_detail_id = match_detail_id
+            pi_obj.summoner_id = summoners[(kwargs['player']['summonerId'], region.upper())]
             pi_objs.append(pi_obj)
-            player_kwargs.append(kwargs['player'])
-
-        # Use enumerate to ensure we match up PI objects with the associated player dicts.
-        for idx, obj in enumerate(pi_objs):
-            obj.summoner = Summoner.objects.create_or_update_summoner_from_match(
-                obj.match_detail.region, player_kwargs[idx])
 
         self.bulk_create(pi_objs)
         logger.debug('Bulk created {} participant identities'.format(len(participant_identities)))
 
+    def bulk_create_participant_identities(self, participant_identities):
+        """
+        Accepts a list of kwargs for participant identities in snakeCase and bulk inserts
+        them for the MatchDetail this manager is related to.
+
+        See bulk_create_participant_identity_sets.
+        """
+        self.bulk_create_participant_identity_sets([(self.instance.id, self.instance.region, kwargs)
+                                                    for kwargs in participant_identities])
+
 
 class ParticipantIdentity(IterableDataFieldsMixin, models.Model):
     participant_id = models.IntegerField()
@@ -247,6 +492,66 @@ class ParticipantIdentity(IterableDataFieldsMixin, models.Model):
         return self.summoner.name
 
 
+class SummonerMatchManager(models.Manager):
+    def index_matches(self, match_detail_ids):
+        """
+        Accepts a list of MatchDetail primary keys and indexes the matches for each of
+        their participants that is linked to a summoner.
+
+        Participants and participant identities must already be stored.
+        """
+        if not match_detail_ids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO {table} (summoner_id, match_detail_id, match_creation, match_id,
+                                     champion_id, winner, kda)
+                SELECT pi.summoner_id, m.id, m.match_creation, m.match_id, p.champion_id, p.winner,
+                       (coalesce(p.kills, 0) + coalesce(p.assists, 0))::double precision
+                       / greatest(coalesce(p.deaths, 0), 1)
+                FROM {match_table} m
+                JOIN {identity_table} pi ON pi.match_detail_id = m.id
+                JOIN {participant_table} p ON p.match_detail_id = m.id
+                                           AND p.participant_id = pi.participant_id
+                WHERE m.id = ANY(%s) AND pi.summoner_id IS NOT NULL
+                ON CONFLICT (summoner_id, match_detail_id) DO NOTHING
+            '''.format(table=table(SummonerMatch),
+                       match_table=table(MatchDetail),
+                       identity_table=table(ParticipantIdentity),
+                       participant_table=table(Participant)),
+                [list(match_detail_ids)])
+
+        logger.debug('Indexed {} matches by summoner'.format(len(match_detail_ids)))
+
+
+class SummonerMatch(models.Model):
+    """
+    A denormalized index of the matches each summoner played in, with the summary shown
+    in their match history, so their matches can be listed newest first without
+    joining through ParticipantIdentity and Participant.
+
+    Maintained by the MatchDetail creation methods (and the load_matches command).
+    """
+    # Covered by the indexes below, which lead with the summoner.
+    summoner = models.ForeignKey(Summoner, db_index=False)
+    match_detail = models.ForeignKey(MatchDetail)
+    match_creation = models.BigIntegerField()
+    match_id = models.BigIntegerField()
+    champion_id = models.IntegerField()
+    winner = models.BooleanField()
+    kda = models.FloatField()       # (kills + assists) / max(deaths, 1)
+
+    objects = SummonerMatchManager()
+
+    def __str__(self):
+        return '{} in {}'.format(self.summoner_id, self.match_detail_id)
+
+    class Meta:
+        unique_together = ('summoner', 'match_detail')
+        index_together = ('summoner', 'match_creation', 'match_detail')
+
+
 class TeamManager(CreateableFromAttrsMixin, models.Manager):
     def create_team(self, attrs):
         team = self.create(**self.init_dict(attrs))
@@ -256,19 +561,44 @@ class TeamManager(CreateableFromAttrsMixin, models.Manager):
 
         return team
 
-    def bulk_create_teams(self, teams):
+    def bulk_create_team_sets(self, teams):
         """
-        Accepts a list of kwargs for teams in snakeCase and bulk inserts the resulting
-        Team objects created from them.
+        Accepts a list of (match_detail_id, kwargs) tuples, where kwargs are for a team
+        in snakeCase, and bulk inserts the resulting Team objects, reading their IDs back
+        via RETURNING, then bulk inserts their BannedChampions.
         """
-        team_objs = [Team(**self.init_dict(kwargs)) for kwargs in teams]
+        if not teams:
+            return
+
+        fields = list(Team.data_fields())
+        rows = []
+
+        for match_detail_id, kwargs in teams:
+            init_dict = self.init_dict(kwargs)
+            rows.append([init_dict[f] for f in fields] + [match_detail_id])
+
+        created = bulk_insert(Team, fields + ['match_detail_id'], rows,
+                              returning=['id', 'match_detail_id', 'team_id'])
+        pks = {(match_detail_id, team_id): pk for pk, match_detail_id, team_id in created}
 
-        for obj in team_objs:
-            obj.match_detail_id = self.instance.id
+        banned_champion_objs = []
 
-        self.bulk_create(team_objs)
+        for match_detail_id, kwargs in teams:
+            for ban in kwargs.get('bans', []):
+                banned_champion = BannedChampion(**BannedChampion.objects.init_dict(ban))
+                banned_champion.team_id = pks[(match_detail_id, kwargs['teamId'])]
+                banned_champion_objs.append(banned_champion)
+
+        BannedChampion.objects.bulk_create(banned_champion_objs)
         logger.debug('Bulk created {} teams'.format(len(teams)))
 
+    def bulk_create_teams(self, teams):
+        """
+        Accepts a list of kwargs for teams in snakeCase and bulk inserts the resulting
+        Team objects, and their bans, for the MatchDetail this manager is related to.
+        """
+        self.bulk_create_team_sets([(self.instance.id, kwargs) for kwargs in teams])
+
 
 class Team(IterableDataFieldsMixin, models.Model):
     baron_kills = models.IntegerField(null=True, blank=True)
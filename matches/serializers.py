@@ -1,6 +1,7 @@
 import logging
 
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 
 from summoners.models import Summoner
 from .models import (MatchDetail,
@@ -97,3 +98,18 @@ class MatchDetailSerializer(serializers.ModelSerializer):
         fields = [f for f in MatchDetail.data_fields()] + ['participantidentity_set',
                                                            'participant_set',
                                                            'team_set']
+
+
+def render_matches(match_detail_ids):
+    """
+    Returns a dict of {primary key: JSON} of the given matches, as MatchDetailSerializer
+    and the API's JSON renderer would output them.
+
+    See MatchJSONManager.get_or_render.
+    """
+    queryset = MatchDetailSerializer.setup_eager_loading(
+        MatchDetail.objects.filter(pk__in=match_detail_ids))
+    renderer = JSONRenderer()
+
+    return {match.pk: renderer.render(MatchDetailSerializer(match).data).decode()
+            for match in queryset}
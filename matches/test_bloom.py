@@ -0,0 +1,60 @@
+from utils.testcases import RedisTestMixin
+from . import models
+from .bloom import MatchIdFilter
+from .models import MatchDetail
+from .test_models import TestMatchModels
+
+
+class MatchIdFilterTestCase(RedisTestMixin, TestMatchModels):
+    redis_prefix = 'test-bloom'
+
+    def setUp(self):
+        super().setUp()
+        self.filter = MatchIdFilter(prefix=self.redis_prefix, bits=2 ** 16)
+
+    def test_everything_might_be_stored_until_built(self):
+        self.assertEqual(self.filter.might_contain('NA', [1, 2]), {1, 2})
+
+    def test_rebuild(self):
+        """
+        Ensure a rebuilt filter contains the stored matches and (barring false
+        positives) not others.
+        """
+        self.filter.rebuild(self.match.region)
+
+        self.assertEqual(self.filter.might_contain(self.match.region,
+                                                   [self.match.match_id, 1, 2, 3]),
+                         {self.match.match_id})
+
+    def test_add(self):
+        self.filter.rebuild('NA')
+        self.filter.add('NA', [12345])
+
+        self.assertEqual(self.filter.might_contain('na', [12345, 54321]), {12345})
+
+    def test_rebuild_missing(self):
+        """
+        Ensure filters are only built for regions that don't have one.
+        """
+        self.filter.rebuild_missing()
+        self.assertTrue(self.redis.exists(self.redis_prefix + ':' + self.match.region.upper()))
+
+        self.filter.add(self.match.region, [12345])
+        self.filter.rebuild_missing()
+
+        self.assertIn(12345, self.filter.might_contain(self.match.region, [12345]))
+
+    def test_create_match_survives_false_negative(self):
+        """
+        Ensure a stored match that the filter misses isn't stored again.
+        """
+        # A built filter that has none of the stored matches.
+        self.redis.setbit(self.redis_prefix + ':' + self.match.region.upper(), 2 ** 16 - 1, 0)
+        match_filter, models.match_filter = models.match_filter, self.filter
+
+        try:
+            self.assertIsNone(MatchDetail.objects.create_match(self.match_data))
+        finally:
+            models.match_filter = match_filter
+
+        self.assertEqual(MatchDetail.objects.count(), 1)
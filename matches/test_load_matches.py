@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from copy import deepcopy
+from io import StringIO
+
+from django.core.management import call_command
+
+from summoners.models import Summoner
+from .models import MatchDetail, Participant, ParticipantIdentity, SummonerMatch
+from .test_models import TestMatchModels
+
+
+class LoadMatchesTestCase(TestMatchModels):
+    def setUp(self):
+        super().setUp()
+
+        new_matches = []
+
+        for offset in (1, 2):
+            match_data = deepcopy(self.match_data)
+            match_data['matchId'] += offset
+            new_matches.append(match_data)
+
+        # A player that isn't stored yet.
+        new_matches[1]['participantIdentities'][0]['player'].update(summonerId=1,
+                                                                    summonerName='New Player')
+
+        # The stored match, the new ones and a repeat, which lands in another batch.
+        lines = [self.match_data] + new_matches + [new_matches[0]]
+
+        fd, self.path = tempfile.mkstemp(suffix='.ndjson')
+        self.addCleanup(os.remove, self.path)
+
+        with os.fdopen(fd, 'w') as dump:
+            dump.write('\n'.join(json.dumps(attrs) for attrs in lines))
+
+    def load(self):
+        call_command('load_matches', self.path, batch_size=2, stdout=StringIO())
+
+    def assert_counts(self, summoners):
+        self.assertEqual(MatchDetail.objects.count(), 3)
+        self.assertEqual(Participant.objects.count(), 30)
+        self.assertEqual(ParticipantIdentity.objects.count(), 30)
+        self.assertEqual(SummonerMatch.objects.count(), 30)
+        self.assertEqual(Summoner.objects.count(), summoners)
+
+    def test_load(self):
+        """
+        Ensure new matches are loaded with their related models and new summoners,
+        and stored or repeated matches are loaded once.
+        """
+        summoners = Summoner.objects.count()
+        self.load()
+
+        self.assert_counts(summoners + 1)
+
+        match = MatchDetail.objects.get(match_id=self.match_data['matchId'] + 1)
+        participant = match.participant_set.get(participant_id=1)
+
+        self.assertEqual(match.team_set.get(team_id=100).bannedchampion_set.count(), 3)
+        self.assertEqual(participant.participanttimeline_set.get().lane, 'JUNGLE')
+        self.assertEqual(participant.mastery_set.count(), 15)
+        self.assertEqual(participant.rune_set.count(), 4)
+        self.assertEqual(Summoner.objects.get(summoner_id=1, region='NA').std_name, 'newplayer')
+
+    def test_reload(self):
+        """
+        Ensure loading the same dump again changes nothing.
+        """
+        summoners = Summoner.objects.count()
+        self.load()
+        self.load()
+
+        self.assert_counts(summoners + 1)
@@ -1,7 +1,14 @@
+import json
+from copy import deepcopy
+from datetime import datetime
+
+import pytz
+
 from django.test import TestCase
 
 from summoners.models import Summoner
-from .models import MatchDetail
+from .models import MatchDetail, Participant, BannedChampion, SummonerMatch, MatchJSON
+from .serializers import render_matches
 
 class TestMatchModels(TestCase):
     """
@@ -1243,6 +1250,142 @@ class MatchDetailTestCase(TestMatchModels):
 
         self.assertEqual(str(self.match.match_date()), expected_str)
 
+    def test_create_stores_bans(self):
+        """
+        Ensure creating a match also creates its teams' bans.
+        """
+        bans = BannedChampion.objects.filter(team__match_detail=self.match)
+
+        self.assertEqual(bans.count(), 6)
+        self.assertEqual(bans.get(champion_id=79).team.team_id, 200)
+
+class BulkCreateMatchesTestCase(TestMatchModels):
+    def _new_match_data(self, offset):
+        match_data = deepcopy(self.match_data)
+        match_data['matchId'] += offset
+
+        return match_data
+
+    def test_bulk_create_new_matches(self):
+        """
+        Ensure bulk creation stores every match and all of its related models.
+        """
+        created = MatchDetail.objects.bulk_create_matches([self._new_match_data(1),
+                                                           self._new_match_data(2)])
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(MatchDetail.objects.count(), 3)
+
+        match = MatchDetail.objects.get(pk=created[0])
+        participant = match.participant_set.get(participant_id=1)
+
+        self.assertEqual(match.participant_set.count(), 10)
+        self.assertEqual(match.participantidentity_set.count(), 10)
+        self.assertEqual(match.team_set.count(), 2)
+        self.assertEqual(participant.champion_id, 154)
+        self.assertEqual(participant.participanttimeline_set.get().lane, 'JUNGLE')
+        self.assertEqual(participant.mastery_set.count(), 15)
+        self.assertEqual(participant.rune_set.count(), 4)
+        self.assertEqual(match.team_set.get(team_id=100).bannedchampion_set.count(), 3)
+
+    def test_bulk_create_skips_known_and_duplicate_matches(self):
+        """
+        Ensure matches already stored, or repeated within the batch, are only stored once.
+        """
+        new_match_data = self._new_match_data(1)
+        created = MatchDetail.objects.bulk_create_matches([self.match_data,
+                                                           new_match_data,
+                                                           deepcopy(new_match_data)])
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(MatchDetail.objects.count(), 2)
+        self.assertEqual(Participant.objects.count(), 20)
+
+    def test_bulk_create_nothing_new(self):
+        """
+        Ensure bulk creation of only known matches does nothing.
+        """
+        self.assertEqual(MatchDetail.objects.bulk_create_matches([self.match_data]), [])
+
+    def test_bulk_create_isolates_failures(self):
+        """
+        Ensure a match that can't be stored doesn't keep the others in its batch
+        from being stored.
+        """
+        broken_match_data = self._new_match_data(2)
+        broken_match_data.pop('teams')
+
+        created, failed = MatchDetail.objects.bulk_create_matches_isolated(
+            [self._new_match_data(1), broken_match_data])
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(list(failed), [(broken_match_data['matchId'], broken_match_data['region'])])
+        self.assertEqual(MatchDetail.objects.count(), 2)
+        self.assertFalse(MatchDetail.objects.filter(match_id=broken_match_data['matchId']).exists())
+
+class SummonerMatchTestCase(TestMatchModels):
+    def test_create_indexes_match(self):
+        """
+        Ensure creating a match indexes it for each of its summoners.
+        """
+        summoner = Summoner.objects.get(summoner_id=53434501, region='NA')
+        summoner_match = SummonerMatch.objects.get(summoner=summoner)
+
+        self.assertEqual(SummonerMatch.objects.filter(match_detail=self.match).count(), 10)
+        self.assertEqual(summoner_match.match_creation, self.match.match_creation)
+        self.assertEqual(summoner_match.champion_id, 154)
+        self.assertAlmostEqual(summoner_match.kda, 1.1)
+
+    def test_summoner_matches_newest_first(self):
+        """
+        Ensure a summoner's matches are listed newest first, including bulk created ones.
+        """
+        newer_match_data = deepcopy(self.match_data)
+        newer_match_data['matchId'] += 1
+        newer_match_data['matchCreation'] += 1
+        MatchDetail.objects.bulk_create_matches([newer_match_data])
+
+        summoner = Summoner.objects.get(summoner_id=53434501, region='NA')
+
+        self.assertEqual([m.match_id for m in summoner.matches(10)],
+                         [newer_match_data['matchId'], self.match_data['matchId']])
+        self.assertEqual(summoner.most_recent_match_date(),
+                         datetime.fromtimestamp(newer_match_data['matchCreation'] / 1000, tz=pytz.utc))
+
+
+class MatchJSONTestCase(TestMatchModels):
+    def setUp(self):
+        super().setUp()
+        self.rendered = []
+
+    def render(self, match_detail_ids):
+        self.rendered.extend(match_detail_ids)
+        return render_matches(match_detail_ids)
+
+    def test_rendered_once(self):
+        """
+        Ensure a match is only rendered the first time its JSON is asked for.
+        """
+        first = MatchJSON.objects.get_or_render([self.match.pk], self.render)
+        second = MatchJSON.objects.get_or_render([self.match.pk], self.render)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.rendered, [self.match.pk])
+        self.assertEqual(json.loads(first[self.match.pk])['match_id'], self.match.match_id)
+
+    def test_outdated_version_rerendered(self):
+        """
+        Ensure renderings of an older version are replaced.
+        """
+        MatchJSON.objects.create(match_detail=self.match, version=MatchJSON.VERSION - 1, json='{}')
+
+        blobs = MatchJSON.objects.get_or_render([self.match.pk], self.render)
+
+        self.assertEqual(self.rendered, [self.match.pk])
+        self.assertEqual(MatchJSON.objects.get().json, blobs[self.match.pk])
+        self.assertEqual(MatchJSON.objects.get().version, MatchJSON.VERSION)
+
+
 class BannedChampionTestCase(TestMatchModels):
     def test_create(self):
         """
@@ -0,0 +1,109 @@
+import json
+from copy import deepcopy
+
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from .models import MatchDetail, MatchJSON
+from .serializers import MatchDetailSerializer
+from .test_models import TestMatchModels
+from .views import MatchDetailViewSet
+
+
+class MatchPaginationTestCase(TestMatchModels):
+    def setUp(self):
+        super().setUp()
+
+        newer_matches = []
+
+        for offset in (1, 2):
+            match_data = deepcopy(self.match_data)
+            match_data['matchId'] += offset
+            match_data['matchCreation'] += offset
+            newer_matches.append(match_data)
+
+        MatchDetail.objects.bulk_create_matches(newer_matches)
+        self.summoner = self.match.participantidentity_set.get(participant_id=1).summoner
+
+    def get(self, url, data=None):
+        return json.loads(self.client.get(url, data).content.decode())
+
+    def assert_paginated(self, url):
+        first_page = self.get(url, {'page_size': 2})
+
+        self.assertEqual([m['match_id'] for m in first_page['results']],
+                         [self.match.match_id + 2, self.match.match_id + 1])
+        self.assertIsNone(first_page['previous'])
+
+        second_page = self.get(first_page['next'])
+
+        self.assertEqual([m['match_id'] for m in second_page['results']], [self.match.match_id])
+        self.assertIsNone(second_page['next'])
+
+    def test_match_detail_pagination(self):
+        """
+        Ensure matches are paginated newest first, honoring page_size.
+        """
+        self.assert_paginated('/matchdetails/')
+
+    def test_summoner_match_pagination(self):
+        """
+        Ensure a summoner's matches are paginated newest first, honoring page_size.
+        """
+        self.assert_paginated('/summoner-matches/{}'.format(self.summoner.pk))
+
+
+class RenderedMatchesTestCase(TestMatchModels):
+    def serialized(self, match):
+        return json.loads(JSONRenderer().render(MatchDetailSerializer(match).data).decode())
+
+    def test_retrieve(self):
+        """
+        Ensure a match is served as MatchDetailSerializer would output it, from its
+        stored JSON.
+        """
+        response = self.client.get('/matchdetails/{}/'.format(self.match.pk))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode()), self.serialized(self.match))
+        self.assertTrue(MatchJSON.objects.filter(match_detail=self.match).exists())
+
+    def test_list_envelope(self):
+        """
+        Ensure a page of matches has the paginator's envelope, with the matches as
+        MatchDetailSerializer would output them.
+        """
+        content = json.loads(self.client.get('/matchdetails/').content.decode())
+
+        self.assertEqual(set(content), {'next', 'previous', 'results'})
+        self.assertEqual(content['results'], [self.serialized(self.match)])
+
+    def test_list_without_pagination(self):
+        """
+        Ensure matches are served as a list when the view isn't paginated.
+        """
+        view = MatchDetailViewSet.as_view({'get': 'list'}, pagination_class=None)
+        response = view(RequestFactory().get('/matchdetails/'))
+        response.render()
+
+        self.assertEqual(json.loads(response.content.decode()), [self.serialized(self.match)])
+
+    def test_browsable_api(self):
+        """
+        Ensure the stored JSON is also served through the browsable API.
+        """
+        response = self.client.get('/matchdetails/{}/'.format(self.match.pk), HTTP_ACCEPT='text/html')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+
+    def test_deleted_match_skipped(self):
+        """
+        Ensure matches deleted since they were read are left out.
+        """
+        view = MatchDetailViewSet()
+        deleted = MatchDetail(pk=self.match.pk + 1)
+
+        self.assertEqual(json.loads(view.rendered_matches([self.match, deleted])[0]),
+                         self.serialized(self.match))
+        self.assertEqual(len(view.rendered_matches([self.match, deleted])), 1)
@@ -1,39 +1,87 @@
 import logging
 
-from rest_framework import viewsets, generics
-from rest_framework.pagination import PageNumberPagination
-
-from summoners.models import Summoner
-from .models import MatchDetail
-from .serializers import MatchDetailSerializer
+from django.http import Http404
+from rest_framework import viewsets, generics, renderers
+from rest_framework.response import Response
+from .models import MatchDetail, MatchJSON
+from .serializers import MatchDetailSerializer, render_matches
+from utils.pagination import CursorPagination
+from utils.renderers import RawJSON, RawJSONRenderer
 
 logger = logging.getLogger(__name__)
 
 
-class MatchDetailResultsSetPagination(PageNumberPagination):
+class MatchDetailResultsSetPagination(CursorPagination):
+    """
+    Paginates matches newest first. A page is found through the index on
+    (match_creation, id) from the cursor's match_creation, instead of by skipping
+    every earlier row; matches created at the same time are skipped by offset.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('-match_creation', '-id')
+
+
+class SummonerMatchResultsSetPagination(MatchDetailResultsSetPagination):
+    """
+    Paginates a summoner's matches newest first through their SummonerMatch
+    index, see MatchDetailManager.for_summoner.
+    """
+    ordering = ('-summoner_match_creation', '-summoner_match_detail')
+
+
+class RenderedMatchesMixin:
+    """
+    Mixin for match views that serves the stored JSON of matches (see MatchJSON)
+    instead of serializing them on every request; RawJSONRenderer splices it into
+    the response.
+
+    Only the columns needed to paginate are read for a page of matches; the
+    matches that haven't been rendered yet are loaded in full by render_matches.
+    """
+    renderer_classes = (RawJSONRenderer, renderers.BrowsableAPIRenderer)
+
+    def rendered_matches(self, matches):
+        pks = [match.pk for match in matches]
+        blobs = MatchJSON.objects.get_or_render(pks, render_matches)
+
+        # Matches deleted since they were read can't be rendered, and are left out.
+        return [RawJSON(blobs[pk]) for pk in pks if pk in blobs]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).only('id', 'match_creation')
+        page = self.paginate_queryset(queryset)
+
+        if page is not None:
+            return self.get_paginated_response(self.rendered_matches(page))
+
+        return Response(self.rendered_matches(queryset))
 
+    def retrieve(self, request, *args, **kwargs):
+        rendered = self.rendered_matches([self.get_object()])
 
-class MatchDetailViewSet(viewsets.ReadOnlyModelViewSet):
+        if not rendered:
+            raise Http404
+
+        return Response(rendered[0])
+
+
+class MatchDetailViewSet(RenderedMatchesMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MatchDetail.objects.all()
     serializer_class = MatchDetailSerializer
     pagination_class = MatchDetailResultsSetPagination
 
 
-class MatchListForSummoner(generics.ListAPIView):
+class MatchListForSummoner(RenderedMatchesMixin, generics.ListAPIView):
     """
     This view should return a list of all the matches for
     the summoner as determined by the summoner_pk portion
     of the URL.
     """
     serializer_class = MatchDetailSerializer
-    pagination_class = MatchDetailResultsSetPagination
+    pagination_class = SummonerMatchResultsSetPagination
 
     def get_queryset(self):
         summoner_pk = self.kwargs['summoner_pk']
-        queryset = Summoner.objects.get(pk=summoner_pk).matches(0)
-        queryset = self.get_serializer_class().setup_eager_loading(queryset)
-
-        return queryset
+        return MatchDetail.objects.for_summoner(summoner_pk)
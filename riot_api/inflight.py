@@ -0,0 +1,64 @@
+"""
+A registry of match IDs that are being fetched, shared by all workers through Redis.
+
+Players of the same match have it in their match lists, so concurrent crawls of
+their match histories would otherwise each fetch it before any of them stores it.
+Claiming a match ID is atomic (SET NX), so only one of them does.
+
+Claims are released when a match can't be fetched or stored (see riot_api and the
+store tasks), so the next crawl tries it again instead of waiting out the TTL.
+"""
+
+import logging
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Long enough for a claimed match to be fetched and stored when queues are backed
+# up; if a fetch fails, the match can be claimed again once this passes.
+MATCH_CLAIM_TTL = 30 * 60
+
+
+class InFlightRegistry:
+    def __init__(self, client=None, prefix='inflight:match', ttl=MATCH_CLAIM_TTL):
+        self.client = client if client is not None else get_redis()
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, region, match_id):
+        return '{}:{}:{}'.format(self.prefix, region.lower(), match_id)
+
+    def claim(self, region, match_ids):
+        """
+        Claims the given match IDs of `region` for fetching.
+
+        Returns the list of those that were claimed, i.e. that no one else
+        had claimed within the TTL.
+        """
+        match_ids = list(match_ids)
+        pipe = self.client.pipeline(transaction=False)
+
+        for match_id in match_ids:
+            pipe.set(self._key(region, match_id), 1, ex=self.ttl, nx=True)
+
+        claimed = [match_id for match_id, was_set in zip(match_ids, pipe.execute()) if was_set]
+
+        if len(claimed) != len(match_ids):
+            logger.debug('{} of {} matches already claimed'.format(len(match_ids) - len(claimed),
+                                                                   len(match_ids)))
+
+        return claimed
+
+    def release(self, region, match_ids):
+        """
+        Releases claims, e.g. so that matches that couldn't be fetched can be
+        claimed again right away.
+        """
+        keys = [self._key(region, match_id) for match_id in match_ids]
+
+        if keys:
+            self.client.delete(*keys)
+
+
+match_claims = InFlightRegistry()
@@ -0,0 +1,141 @@
+"""
+A rate limiter for Riot's API that is shared by every process using the same API key.
+
+Riot enforces several windows at once (e.g. 10 req / 10 sec and 500 req / 10 min)
+per API key and region, so requests are counted in one Redis sorted set per window,
+per key and region. A request is only admitted if every window has room for it,
+in which case it is counted in all of them atomically.
+
+A share of every window can be reserved for interactive requests (made on behalf
+of a user waiting for a page, see riot_api.routing). Other requests (crawls) are
+only admitted while the window is below the unreserved part, so they fill
+whatever budget interactive requests leave but can never use up all of it.
+"""
+
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: the block key followed by one key per window.
+# ARGV: now (ms), a unique member for the request, then (allowed, window ms) per window.
+# Returns 0 if the request was admitted, otherwise the ms to wait before trying again.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local blocked = redis.call('PTTL', KEYS[1])
+
+if blocked > 0 then
+    return blocked
+end
+
+local wait = 0
+
+for i = 2, #KEYS do
+    local allowed = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - window)
+
+    if redis.call('ZCARD', KEYS[i]) >= allowed then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+
+if wait > 0 then
+    return wait
+end
+
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], now, ARGV[2])
+    redis.call('PEXPIRE', KEYS[i], tonumber(ARGV[2 * i]))
+end
+
+return 0
+"""
+
+
+class RateLimiter:
+    """
+    Accepts an API key, a sequence of (allowed requests, seconds) windows and the
+    share (0 <= share < 1) of each window reserved for interactive requests.
+
+    Only a hash of the key is stored in Redis.
+    """
+    def __init__(self, api_key, limits=None, client=None, prefix='ratelimit',
+                 interactive_share=0):
+        if not 0 <= interactive_share < 1:
+            raise ValueError('interactive_share must be in [0, 1): {}'.format(interactive_share))
+
+        self.limits = limits if limits is not None else settings.RIOT_API_RATE_LIMITS
+        self.interactive_share = interactive_share
+        self.client = client if client is not None else get_redis()
+        self.prefix = '{}:{}'.format(prefix, hashlib.sha1(api_key.encode()).hexdigest()[:12])
+        self._acquire = self.client.register_script(_ACQUIRE_SCRIPT)
+        self._count = 0
+
+    def _block_key(self, region):
+        return '{}:{}:blocked'.format(self.prefix, region.lower())
+
+    def _window_key(self, region, seconds):
+        return '{}:{}:{}'.format(self.prefix, region.lower(), seconds)
+
+    def allowed(self, allowed, interactive=False):
+        """
+        Returns how many of a window's `allowed` requests a request of the given
+        priority may count against.
+        """
+        if interactive:
+            return allowed
+
+        # Crawls always get at least one request, or they'd never be admitted.
+        return max(1, math.floor(allowed * (1 - self.interactive_share)))
+
+    def acquire(self, region, interactive=False):
+        """
+        Attempts to count a request against the limits of `region`. Interactive
+        requests may use the reserved share of the limits, others may not.
+
+        Returns 0 if the request may be made now, otherwise the number of seconds
+        to wait before trying again.
+        """
+        self._count += 1
+        now_ms = int(time.time() * 1000)
+        member = '{}:{}:{}'.format(now_ms, id(self), self._count)
+
+        keys = [self._block_key(region)]
+        args = [now_ms, member]
+
+        for allowed, seconds in self.limits:
+            keys.append(self._window_key(region, seconds))
+            args.extend([self.allowed(allowed, interactive), seconds * 1000])
+
+        wait_ms = self._acquire(keys=keys, args=args)
+
+        if wait_ms:
+            logger.debug('Rate limit for %s reached (interactive: %s), wait %s ms',
+                         region, interactive, wait_ms)
+
+        return wait_ms / 1000
+
+    def block(self, region, seconds):
+        """
+        Stops all requests to `region` from being admitted for `seconds`,
+        e.g. as instructed by the Retry-After header of a 429 response.
+        """
+        if seconds > 0:
+            self.client.set(self._block_key(region), 1, px=int(seconds * 1000))
+            logger.warning('Blocked requests to %s for %s sec', region, seconds)
+
+    def min_interval(self):
+        """
+        Returns the average number of seconds between requests that the tightest
+        window allows crawls, i.e. their sustained rate for a single region.
+        """
+        return max(seconds / self.allowed(allowed) for allowed, seconds in self.limits)
@@ -0,0 +1,56 @@
+"""
+Routes riot_api tasks to a queue per region, so that each region is worked through
+independently of the others (Riot's rate limits are per region as well, see
+riot_api.ratelimit).
+
+Each region has two queues (lanes): one for interactive calls, made on behalf of a
+user waiting for a page, and one for crawls (e.g. utils.bulk). Interactive queues are
+worked by their own workers and have a reserved share of the rate limits, so a
+backlog of crawls can't delay a user's request.
+"""
+
+from riotwatcher.riotwatcher import NORTH_AMERICA, platforms
+
+RIOT_API_TASK = 'lol_stats2.celery.riot_api'
+
+# Priorities, passed as the `priority` kwarg of riot_api calls (see RiotAPI).
+INTERACTIVE = 'interactive'
+CRAWL = 'crawl'
+
+
+def region_queue_name(region, priority=CRAWL):
+    name = 'riot_api.{}'.format(region.lower())
+
+    if priority == INTERACTIVE:
+        name = '{}.{}'.format(name, INTERACTIVE)
+
+    return name
+
+
+# One queue per region and priority for every region that riotwatcher knows the
+# platform of.
+REGION_QUEUE_NAMES = [region_queue_name(region, priority)
+                      for region in sorted(platforms)
+                      for priority in (INTERACTIVE, CRAWL)]
+
+
+class RegionRouter:
+    """
+    Celery router (see CELERY_ROUTES) that sends riot_api tasks to the queue
+    of the region and priority in their kwargs. Tasks without a region go to
+    the queues of RiotWatcher's default region, tasks without a priority are
+    crawls.
+    """
+    def route_for_task(self, task, args=None, kwargs=None):
+        if task != RIOT_API_TASK:
+            return None
+
+        # riot_api takes its API call kwargs as its single positional argument.
+        call_kwargs = args[0] if args else (kwargs or {}).get('kwargs', {})
+        region = call_kwargs.get('region') or NORTH_AMERICA
+        queue = region_queue_name(region, call_kwargs.get('priority', CRAWL))
+
+        return {'queue': queue,
+                'exchange': 'default',
+                'exchange_type': 'topic',
+                'routing_key': queue}
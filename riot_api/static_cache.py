@@ -0,0 +1,89 @@
+"""
+A Redis cache for responses of Riot's static data endpoints.
+
+Static data only changes with the game version, so responses are cached under
+the version they are for. Calls that don't ask for a specific version are cached
+under the current version, as reported by static_get_versions (itself cached
+briefly), so a new patch is picked up as soon as that expires.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# How long the current version is trusted before asking Riot again.
+VERSIONS_TTL = 60 * 60
+
+# Entries are never invalidated (a new version means a new key), so this just
+# bounds how long unused versions' data is kept.
+RESPONSE_TTL = 60 * 60 * 24 * 30
+
+
+class StaticDataCache:
+    def __init__(self, client=None, prefix='static'):
+        self.client = client if client is not None else get_redis()
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(func):
+        """
+        Returns True for the static data methods of RiotWatcher that take a version.
+        """
+        return func.__name__.startswith('static_') and \
+            'version' in inspect.signature(func).parameters
+
+    def current_version(self, region, get_versions):
+        """
+        Returns the latest version listed by `get_versions` (i.e.
+        RiotWatcher.static_get_versions), caching it for VERSIONS_TTL.
+        """
+        key = '{}:versions:{}'.format(self.prefix, region)
+        version = self.client.get(key)
+
+        if version is not None:
+            return version.decode()
+
+        version = get_versions(region=region)[0]
+        self.client.set(key, version, ex=VERSIONS_TTL)
+        logger.debug('Current static data version for %s is %s', region, version)
+
+        return version
+
+    def _key(self, method, kwargs, region, version):
+        other_kwargs = {k: v for k, v in kwargs.items()
+                        if k not in ('region', 'locale', 'version')}
+        digest = hashlib.sha1(json.dumps(other_kwargs, sort_keys=True).encode()).hexdigest()
+
+        return '{}:{}:{}:{}:{}:{}'.format(self.prefix, method, region,
+                                          kwargs.get('locale') or 'default', version, digest)
+
+    def get_or_fetch(self, func, kwargs, get_versions, default_region):
+        """
+        Returns the cached response for calling `func` (a static data method of
+        RiotWatcher) with `kwargs`, calling it and caching the response on a miss.
+        """
+        # The region is resolved first, so a call for the default region is cached
+        # under the same key whether or not it names it.
+        region = (kwargs.get('region') or default_region).lower()
+        version = kwargs.get('version') or self.current_version(region, get_versions)
+        key = self._key(func.__name__, kwargs, region, version)
+        cached = self.client.get(key)
+
+        if cached is not None:
+            self.hits += 1
+            logger.debug('Static data cache hit: %s', key)
+            return json.loads(cached.decode())
+
+        self.misses += 1
+        result = func(**kwargs)
+        self.client.set(key, json.dumps(result), ex=RESPONSE_TTL)
+        logger.info('Cached static data: %s', key)
+
+        return result
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from utils.testcases import RedisTestMixin
+from .inflight import InFlightRegistry
+
+
+class InFlightRegistryTestCase(RedisTestMixin, SimpleTestCase):
+    redis_prefix = 'test-inflight'
+
+    def setUp(self):
+        super().setUp()
+        self.registry = InFlightRegistry(prefix=self.redis_prefix)
+
+    def test_claim_once(self):
+        """
+        Ensure each match ID is only claimed once, even by different registries.
+        """
+        other = InFlightRegistry(prefix=self.redis_prefix)
+
+        self.assertEqual(self.registry.claim('NA', [1, 2]), [1, 2])
+        self.assertEqual(other.claim('na', [2, 3]), [3])
+
+    def test_regions_are_separate(self):
+        self.registry.claim('NA', [1])
+
+        self.assertEqual(self.registry.claim('EUW', [1]), [1])
+
+    def test_release(self):
+        self.registry.claim('NA', [1])
+        self.registry.release('NA', [1])
+
+        self.assertEqual(self.registry.claim('NA', [1]), [1])
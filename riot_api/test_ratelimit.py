@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+
+from utils.testcases import RedisTestMixin
+from .ratelimit import RateLimiter
+
+
+class RateLimiterTestCase(RedisTestMixin, SimpleTestCase):
+    redis_prefix = 'test-ratelimit'
+
+    def setUp(self):
+        super().setUp()
+        self.limiter = RateLimiter('test-key', limits=((2, 10), (3, 600)),
+                                   prefix=self.redis_prefix)
+
+    def test_acquire_within_limits(self):
+        """
+        Ensure requests are admitted until the tightest window is full.
+        """
+        self.assertEqual(self.limiter.acquire('na'), 0)
+        self.assertEqual(self.limiter.acquire('na'), 0)
+        self.assertGreater(self.limiter.acquire('na'), 0)
+
+    def test_regions_are_independent(self):
+        """
+        Ensure a full region doesn't hold back other regions.
+        """
+        self.limiter.acquire('na')
+        self.limiter.acquire('na')
+
+        self.assertGreater(self.limiter.acquire('na'), 0)
+        self.assertEqual(self.limiter.acquire('euw'), 0)
+
+    def test_limiters_share_counts(self):
+        """
+        Ensure limiters for the same key (e.g. in different workers) share their counts.
+        """
+        other = RateLimiter('test-key', limits=((2, 10), (3, 600)), prefix=self.redis_prefix)
+
+        self.limiter.acquire('na')
+        other.acquire('na')
+
+        self.assertGreater(self.limiter.acquire('na'), 0)
+
+    def test_block(self):
+        """
+        Ensure a block (as from Retry-After) rejects requests for its duration.
+        """
+        self.limiter.block('na', 5)
+
+        wait = self.limiter.acquire('na')
+
+        self.assertGreater(wait, 4)
+        self.assertLessEqual(wait, 5)
+
+    def test_interactive_share(self):
+        """
+        Ensure crawls can't use the share of the limits reserved for interactive requests.
+        """
+        limiter = RateLimiter('test-key', limits=((4, 10), (10, 600)), prefix=self.redis_prefix,
+                              interactive_share=0.5)
+
+        self.assertEqual(limiter.acquire('na'), 0)
+        self.assertEqual(limiter.acquire('na'), 0)
+        self.assertGreater(limiter.acquire('na'), 0)
+
+        self.assertEqual(limiter.acquire('na', interactive=True), 0)
+        self.assertEqual(limiter.acquire('na', interactive=True), 0)
+        self.assertGreater(limiter.acquire('na', interactive=True), 0)
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from .routing import RegionRouter
+
+
+class RegionRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = RegionRouter()
+
+    def test_routes_by_region(self):
+        """
+        Ensure riot_api tasks are routed to the queue of their region.
+        """
+        route = self.router.route_for_task('lol_stats2.celery.riot_api',
+                                           args=[{'method': 'get_match', 'region': 'EUW'}])
+
+        self.assertEqual(route['queue'], 'riot_api.euw')
+        self.assertEqual(route['routing_key'], 'riot_api.euw')
+
+    def test_default_region(self):
+        """
+        Ensure riot_api tasks without a region go to the default region's queue.
+        """
+        route = self.router.route_for_task('lol_stats2.celery.riot_api',
+                                           args=[{'method': 'static_get_versions',
+                                                  'region': None}])
+
+        self.assertEqual(route['queue'], 'riot_api.na')
+
+    def test_ignores_other_tasks(self):
+        self.assertIsNone(self.router.route_for_task('lol_stats2.celery.store_match'))
+
+    def test_routes_by_priority(self):
+        """
+        Ensure interactive riot_api tasks are routed to their region's interactive queue.
+        """
+        route = self.router.route_for_task('lol_stats2.celery.riot_api',
+                                           args=[{'method': 'get_summoners', 'region': 'euw',
+                                                  'priority': 'interactive'}])
+
+        self.assertEqual(route['queue'], 'riot_api.euw.interactive')
+        self.assertEqual(route['routing_key'], 'riot_api.euw.interactive')
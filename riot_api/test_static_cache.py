@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase
+
+from utils.testcases import RedisTestMixin
+from .static_cache import StaticDataCache
+
+
+class FakeWatcher:
+    def __init__(self):
+        self.calls = 0
+        self.version = '6.1.1'
+
+    def static_get_versions(self, region=None):
+        return [self.version, '5.24.2']
+
+    def static_get_item_list(self, region=None, locale=None, version=None, item_list_data=None):
+        self.calls += 1
+        return {'version': version or self.version, 'data': {}}
+
+    def static_get_realm(self, region=None):
+        return {}
+
+
+class StaticDataCacheTestCase(RedisTestMixin, SimpleTestCase):
+    redis_prefix = 'test-static'
+
+    def setUp(self):
+        super().setUp()
+        self.cache = StaticDataCache(prefix=self.redis_prefix)
+        self.watcher = FakeWatcher()
+
+    def fetch(self, **kwargs):
+        return self.cache.get_or_fetch(self.watcher.static_get_item_list, kwargs,
+                                       self.watcher.static_get_versions, 'na')
+
+    def test_is_cacheable(self):
+        self.assertTrue(self.cache.is_cacheable(self.watcher.static_get_item_list))
+        self.assertFalse(self.cache.is_cacheable(self.watcher.static_get_realm))
+
+    def test_repeated_calls_are_cached(self):
+        """
+        Ensure the same call for the same version only reaches the API once.
+        """
+        first = self.fetch(region='na')
+        second = self.fetch(region='na')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.watcher.calls, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_default_region_shares_key(self):
+        """
+        Ensure a call without a region is cached under the default region.
+        """
+        self.fetch()
+        self.fetch(region='na')
+        self.fetch(region='NA')
+
+        self.assertEqual(self.watcher.calls, 1)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_keyed_by_locale_and_version(self):
+        """
+        Ensure calls for different locales or versions are cached separately.
+        """
+        self.fetch(region='na')
+        self.fetch(region='na', locale='ko_KR')
+        self.fetch(region='na', version='5.24.2')
+
+        self.assertEqual(self.watcher.calls, 3)
+
+    def test_new_version_is_fetched(self):
+        """
+        Ensure a new current version misses the cache once the cached version expires.
+        """
+        self.fetch(region='na')
+        self.watcher.version = '6.2.1'
+        self.redis.delete(self.redis_prefix + ':versions:na')
+
+        self.assertEqual(self.fetch(region='na')['version'], '6.2.1')
+        self.assertEqual(self.watcher.calls, 2)
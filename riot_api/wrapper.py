@@ -10,7 +10,7 @@ from celery import chain, group
 
 from lol_stats2.celery import (app,
                                riot_api,
-                               store_match,
+                               store_match_task,
                                store_summoners,
                                store_league,
                                store_champion_list,
@@ -18,19 +18,26 @@ from lol_stats2.celery import (app,
                                store_item_match_list)
 from matches.models import MatchDetail
 from summoners.models import Summoner
+from riot_api.inflight import match_claims
+from riot_api.routing import CRAWL
+from utils.functions import coalesce_task_ids
 
 logger = logging.getLogger(__name__)
 
-
 class RiotAPI:
     """
     This class contains static methods to generate arguments to pass to riot_api
     as well as tasks related to chained operations, like getting a summoner's matches.
+
+    Methods that make rate limited calls accept a `priority` (see riot_api.routing),
+    which should be INTERACTIVE when a user is waiting for the result.
     """
     @staticmethod
-    def get_summoners(names=None, ids=None, region=None):
+    def get_summoners(names=None, ids=None, region=None, priority=CRAWL, callback=None):
         """
         Gets and stores a list of summoners by name or ID for a given region.
+
+        If given, `callback` is chained after the storing task and receives its result.
         """
         # Coerce to list if a single name or id
         if isinstance(names, str):
@@ -39,9 +46,18 @@ class RiotAPI:
         if isinstance(ids, int):
             ids = list((ids,))
 
-        kwargs = {'method': 'get_summoners', 'names': names, 'ids': ids, 'region': region.lower()}
+        kwargs = {'method': 'get_summoners',
+                  'names': names,
+                  'ids': ids,
+                  'region': region.lower(),
+                  'priority': priority}
+
+        tasks = [riot_api.s(kwargs), store_summoners.s(region=region)]
 
-        return chain(riot_api.s(kwargs), store_summoners.s(region=region))()
+        if callback is not None:
+            tasks.append(callback)
+
+        return chain(*tasks)()
 
     @staticmethod
     def static_get_champion_list(region=None, locale=None, version=None,
@@ -104,7 +120,7 @@ class RiotAPI:
 
     # TODO: Set a reasonable default ttl.
     @staticmethod
-    def get_league(summoner_ids, region=None, ttl=timedelta(seconds=1)):
+    def get_league(summoner_ids, region=None, ttl=timedelta(seconds=1), priority=CRAWL):
         """
         Gets and stores leagues for the given summoner IDs in the given
         region.
@@ -145,7 +161,8 @@ class RiotAPI:
 
         kwargs = {'method': 'get_league',
                   'summoner_ids': list(to_query),
-                  'region': region.lower()}
+                  'region': region.lower(),
+                  'priority': priority}
 
         if len(to_query) != 0:
             return chain(riot_api.s(kwargs), store_league.s(region=region))()
@@ -175,17 +192,19 @@ class RiotAPI:
     def get_match_list(summoner_id, region=None, champion_ids=None,
                        ranked_queues='RANKED_SOLO_5x5,TEAM_BUILDER_DRAFT_RANKED_5x5',
                        season=None, begin_time=None, end_time=None, begin_index=None,
-                       end_index=None, max_matches=10):
+                       end_index=None, max_matches=10, priority=CRAWL):
         """
         Gets all matches that satisfy the filters (args) for the specified summoner ID.
 
         Reads match IDs from the response and starts a group of tasks that each get those
-        matches.
+        matches (see get_matches); all of this happens in a chain, so nothing here waits
+        on a task.
 
         Also updates any extant related summoners' last_matches_update
         fields to now.
 
-        Returns the executed group.
+        Returns the AsyncResult of the chain, the result of which has the IDs of the
+        match tasks under 'task_ids' (see utils.functions.follow_up_task_ids).
         """
         logger.info('Getting matches for {} [{}]'.format(summoner_id, region))
 
@@ -211,7 +230,8 @@ class RiotAPI:
                   'begin_time': begin_time,
                   'end_time': end_time,
                   'begin_index': begin_index,
-                  'end_index': end_index}
+                  'end_index': end_index,
+                  'priority': priority}
 
         for queue in ranked_queues:
             if queue not in _ALLOWED_QUEUES:
@@ -238,16 +258,31 @@ class RiotAPI:
             summoner.save()
             logger.info('Set {} last_matches_update to now: {}'.format(summoner, now))
 
-        get_ids_chain = chain(riot_api.s(kwargs),
-                              RiotAPI.get_matches_from_ids.s(region=region,
-                                                             max_matches=max_matches))
+        return chain(riot_api.s(kwargs),
+                     RiotAPI.get_matches_from_ids.s(region=region, max_matches=max_matches),
+                     RiotAPI.get_matches.s(region=region, priority=priority))()
 
-        return group(chain(RiotAPI.get_match.s(match_id=match_id, region=region),
-                           riot_api.s(),
-                           store_match.s()) for match_id in get_ids_chain().get())()
+    @app.task
+    def get_matches(match_ids, region=None, priority=CRAWL):
+        """
+        Starts a group of tasks that each get and store one of the given matches.
+        Used as a callback of get_matches_from_ids in get_match_list.
+
+        Returns a dict of the IDs of the tasks under 'task_ids'.
+        """
+        if not match_ids:
+            return {'task_ids': []}
+
+        matches = group(chain(RiotAPI.get_match.s(match_id=match_id, region=region,
+                                                  priority=priority),
+                              riot_api.s(),
+                              store_match_task().s()) for match_id in match_ids)()
+
+        return {'task_ids': coalesce_task_ids([matches])}
 
     @app.task
-    def get_match(match_id, region=None, include_timeline=False, execute=False):
+    def get_match(match_id, region=None, include_timeline=False, execute=False,
+                  priority=CRAWL):
         """
         Gets a single match, timeline data optionally included.
 
@@ -259,12 +294,13 @@ class RiotAPI:
         kwargs = {'method': 'get_match',
                   'match_id': match_id,
                   'region': region,
-                  'include_timeline': include_timeline}
+                  'include_timeline': include_timeline,
+                  'priority': priority}
 
         if not execute:
             return kwargs
         else:
-            return chain(riot_api.s(kwargs), store_match.s())()
+            return chain(riot_api.s(kwargs), store_match_task().s())()
 
     # TODO: The region could be passed along with the match IDs so the caller of
     # the chain doesn't have to.
@@ -276,6 +312,10 @@ class RiotAPI:
         stored in the database. Used as a callback in get_match_list after
         receiving a list of matches from Riot.
 
+        Match IDs are claimed (see riot_api.inflight) before being returned, and
+        those claimed by another task within MATCH_CLAIM_TTL are left out, so a
+        match shared by concurrently crawled summoners is only fetched once.
+
         max_matches specifies the maximum number of matches to fetch from the result
         dict.
 
@@ -297,9 +337,11 @@ class RiotAPI:
 
             # Skip the matches that are already stored in the DB.
             result_ids = set([match['matchId'] for match in result['matches']])
-            known_ids = set(MatchDetail.objects.filter(match_id__in=result_ids)
-                            .values_list('match_id', flat=True))
-            ids_to_query = list(result_ids - known_ids)
+            known_ids = set(match_id for match_id, _ in MatchDetail.objects.filter_known(
+                (match_id, region.upper()) for match_id in result_ids))
+
+            # ...and those that another task is already fetching.
+            ids_to_query = match_claims.claim(region, result_ids - known_ids)
 
             logger.info('{} matches will be fetched.'.format(len(ids_to_query)))
         else:
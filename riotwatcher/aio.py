@@ -0,0 +1,205 @@
+"""
+An asyncio counterpart of RiotWatcher, for making many requests concurrently from
+a single process.
+
+All of RiotWatcher's endpoint methods are available and return coroutines.
+"""
+
+import asyncio
+import time
+
+import aiohttp
+
+from .riotwatcher import RiotWatcher, RateLimit, NORTH_AMERICA, raise_status
+
+
+class _StatusResponse:
+    """
+    Adapts an aiohttp response to the interface that raise_status expects.
+    """
+    def __init__(self, response):
+        self.status_code = response.status
+        self.headers = response.headers
+        self._response = response
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+
+class AsyncRiotWatcher(RiotWatcher):
+    """
+    Up to `max_in_flight` requests are made at once over a shared pool of keep-alive
+    connections. Requests are also held back as needed to stay within `limits`
+    (a sequence of (allowed requests, seconds) windows), which are tracked for each
+    region separately, like Riot does. A 429 response with a Retry-After header
+    holds back all requests to its region for that long.
+
+    Static data requests don't count against the limits.
+
+    Use as an async context manager, or call close() when done. The session and the
+    semaphore are created on first use, so they belong to the loop that makes the
+    requests rather than whichever loop was current when the instance was made.
+    """
+    def __init__(self, key, default_region=NORTH_AMERICA, limits=((10, 10), (500, 600)),
+                 max_in_flight=20, timeout=10):
+        # RiotWatcher.__init__ isn't called, as the requests.Session it sets up
+        # would never be used.
+        self.key = key
+        self.default_region = default_region
+        self.limits = ()
+        self.timeout = timeout
+        self.limit_specs = limits
+        self.max_in_flight = max_in_flight
+        self._region_limits = {}
+        self._blocked_until = {}
+        self._semaphore = None
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def async_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        return self._semaphore
+
+    def _limits_for(self, region):
+        if region not in self._region_limits:
+            self._region_limits[region] = [RateLimit(allowed, seconds)
+                                           for allowed, seconds in self.limit_specs]
+
+        return self._region_limits[region]
+
+    def can_make_request(self, region=None):
+        return all(lim.request_available()
+                   for lim in self._limits_for(region or self.default_region))
+
+    def block(self, region, seconds):
+        """
+        Holds back requests to `region` for `seconds`.
+        """
+        self._blocked_until[region] = max(self._blocked_until.get(region, 0),
+                                          time.time() + seconds)
+
+    async def _throttle(self, region):
+        """
+        Waits until a request to `region` fits within the limits, then counts it.
+        """
+        limits = self._limits_for(region)
+
+        while True:
+            now = time.time()
+            wait = self._blocked_until.get(region, 0) - now
+
+            for lim in limits:
+                if not lim.request_available():
+                    wait = max(wait, lim.made_requests[0] - now)
+
+            # Nothing is awaited between the check and counting the request,
+            # so concurrent requests can't both take the last slot.
+            if wait <= 0:
+                for lim in limits:
+                    lim.add_request()
+                return
+
+            await asyncio.sleep(wait)
+
+    async def _get(self, url, args, region=None):
+        params = {k: str(v).lower() if isinstance(v, bool) else str(v) for k, v in args.items()}
+
+        async def request():
+            async with self.async_session.get(url, params=params) as r:
+                if r.status == 429 and region is not None and 'Retry-After' in r.headers:
+                    self.block(region, int(r.headers['Retry-After']))
+
+                if r.status != 200:
+                    raise_status(_StatusResponse(r))
+
+                return await r.json()
+
+        async with self.semaphore:
+            return await asyncio.wait_for(request(), self.timeout)
+
+    async def base_request(self, url, region, static=False, **kwargs):
+        if region is None:
+            region = self.default_region
+        args = {'api_key': self.key}
+        for k in kwargs:
+            if kwargs[k] is not None:
+                args[k] = kwargs[k]
+        if not static:
+            await self._throttle(region)
+        return await self._get(
+            'https://{proxy}.api.pvp.net/api/lol/{static}{region}/{url}'.format(
+                proxy='global' if static else region,
+                static='static-data/' if static else '',
+                region=region,
+                url=url
+            ),
+            args,
+            region=None if static else region
+        )
+
+    async def _observer_mode_request(self, url, proxy=None, **kwargs):
+        if proxy is None:
+            proxy = self.default_region
+        args = {'api_key': self.key}
+        for k in kwargs:
+            if kwargs[k] is not None:
+                args[k] = kwargs[k]
+        await self._throttle(proxy)
+        return await self._get(
+            'https://{proxy}.api.pvp.net/observer-mode/rest/{url}'.format(
+                proxy=proxy,
+                url=url
+            ),
+            args,
+            region=proxy
+        )
+
+    # The following post-process the responses of other endpoint methods,
+    # so they have to await them.
+    async def get_summoner(self, name=None, _id=None, region=None):
+        if (name is None) != (_id is None):
+            if name is not None:
+                name = self.sanitized_name(name)
+                summoners = await self.get_summoners(names=[name, ], region=region)
+                key, summoner = summoners.popitem()
+                return summoner
+            else:
+                summoners = await self.get_summoners(ids=[_id, ], region=region)
+                return summoners[str(_id)]
+        return None
+
+    async def get_teams_for_summoner(self, summoner_id, region=None):
+        teams = await self.get_teams_for_summoners([summoner_id, ], region=region)
+        return teams[str(summoner_id)]
+
+    async def get_team(self, team_id, region=None):
+        teams = await self.get_teams([team_id, ], region=region)
+        return teams[str(team_id)]
+
+    async def get_server_status(self, region=None):
+        if region is None:
+            url = 'shards'
+        else:
+            url = 'shards/{region}'.format(region=region)
+        return await self._get('http://status.leagueoflegends.com/{url}'.format(url=url), {})
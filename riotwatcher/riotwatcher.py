@@ -1,6 +1,7 @@
 from collections import deque
 import time
 import requests
+from requests.adapters import HTTPAdapter
 
 # Constants
 BRAZIL = 'br'
@@ -242,10 +243,24 @@ class RateLimit:
 
 
 class RiotWatcher:
-    def __init__(self, key, default_region=NORTH_AMERICA, limits=(RateLimit(10, 10), RateLimit(500, 600), )):
+    """
+    Requests are made through a single requests.Session, which keeps a pool of up to
+    `pool_size` keep-alive connections per host (i.e. per region, plus the global
+    host for static data). `timeout` is passed to every request, either as a number
+    of seconds or as a (connect, read) tuple.
+    """
+    def __init__(self, key, default_region=NORTH_AMERICA, limits=(RateLimit(10, 10), RateLimit(500, 600), ),
+                 pool_size=10, timeout=(3.05, 10)):
         self.key = key  #If you have a production key, use limits=(RateLimit(3000,10), RateLimit(180000,600),)
         self.default_region = default_region
         self.limits = limits
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        # One pool per region host, the global (static data) host and spare.
+        adapter = HTTPAdapter(pool_connections=len(platforms) + 2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def can_make_request(self):
         for lim in self.limits:
@@ -260,14 +275,15 @@ class RiotWatcher:
         for k in kwargs:
             if kwargs[k] is not None:
                 args[k] = kwargs[k]
-        r = requests.get(
+        r = self.session.get(
             'https://{proxy}.api.pvp.net/api/lol/{static}{region}/{url}'.format(
                 proxy='global' if static else region,
                 static='static-data/' if static else '',
                 region=region,
                 url=url
             ),
-            params=args
+            params=args,
+            timeout=self.timeout
         )
         if not static:
             for lim in self.limits:
@@ -282,12 +298,13 @@ class RiotWatcher:
         for k in kwargs:
             if kwargs[k] is not None:
                 args[k] = kwargs[k]
-        r = requests.get(
+        r = self.session.get(
             'https://{proxy}.api.pvp.net/observer-mode/rest/{url}'.format(
                 proxy=proxy,
                 url=url
             ),
-            params=args
+            params=args,
+            timeout=self.timeout
         )
         for lim in self.limits:
             lim.add_request()
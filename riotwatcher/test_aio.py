@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+from django.test import SimpleTestCase
+
+from .aio import AsyncRiotWatcher
+from .riotwatcher import LoLException, error_404, error_429
+
+
+class FakeResponse:
+    def __init__(self, session, status, headers, body):
+        self.session = session
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def __aenter__(self):
+        self.session.in_flight += 1
+        self.session.max_in_flight = max(self.session.max_in_flight, self.session.in_flight)
+        # Give other requests the chance to start while this one is in flight.
+        await asyncio.sleep(.01)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.session.in_flight -= 1
+
+    async def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(self.status)
+
+
+class FakeSession:
+    """
+    Stands in for an aiohttp.ClientSession, answering every request with the same
+    response and recording what was requested.
+    """
+    def __init__(self, status=200, headers=None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body if body is not None else {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        return FakeResponse(self, self.status, self.headers, self.body)
+
+    async def close(self):
+        self.closed = True
+
+
+class AsyncRiotWatcherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.watcher = AsyncRiotWatcher('test-key', limits=((100, 10),), max_in_flight=2)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_with(self, session, coro):
+        self.watcher._session = session
+        return self.loop.run_until_complete(coro)
+
+    def test_builds_urls(self):
+        """
+        Ensure requests are made to the region's host, with the key and the
+        method's arguments as parameters.
+        """
+        session = FakeSession(body={'foobar': {'id': 1}})
+
+        result = self.run_with(session, self.watcher.get_summoners(names=['Foo Bar'], region='euw'))
+        self.run_with(session, self.watcher.get_match(2))
+        self.run_with(session, self.watcher.static_get_versions())
+
+        self.assertEqual(result, {'foobar': {'id': 1}})
+        self.assertEqual(session.requests, [
+            ('https://euw.api.pvp.net/api/lol/euw/v1.4/summoner/by-name/foobar',
+             {'api_key': 'test-key'}),
+            ('https://na.api.pvp.net/api/lol/na/v2.2/match/2',
+             {'api_key': 'test-key', 'includeTimeline': 'false'}),
+            ('https://global.api.pvp.net/api/lol/static-data/na/v1.2/versions',
+             {'api_key': 'test-key'}),
+        ])
+
+    def test_bounds_requests_in_flight(self):
+        """
+        Ensure no more than `max_in_flight` requests are made at once.
+        """
+        session = FakeSession()
+        requests = asyncio.gather(*[self.watcher.get_match(i) for i in range(5)])
+
+        self.run_with(session, requests)
+
+        self.assertEqual(len(session.requests), 5)
+        self.assertEqual(session.max_in_flight, 2)
+
+    def test_counts_requests_per_region(self):
+        """
+        Ensure requests count against the limits of their region only, and static
+        data requests don't count at all.
+        """
+        session = FakeSession()
+        self.watcher.limit_specs = ((1, 10),)
+
+        self.run_with(session, self.watcher.get_match(1, region='na'))
+        self.run_with(session, self.watcher.static_get_versions())
+
+        self.assertFalse(self.watcher.can_make_request('na'))
+        self.assertTrue(self.watcher.can_make_request('euw'))
+
+    def test_maps_errors(self):
+        """
+        Ensure error responses raise the matching LoLException.
+        """
+        session = FakeSession(status=404)
+
+        with self.assertRaises(LoLException) as cm:
+            self.run_with(session, self.watcher.get_match(1))
+
+        self.assertEqual(cm.exception, error_404)
+
+    def test_retry_after_blocks_region(self):
+        """
+        Ensure a 429 response with a Retry-After header holds back its region.
+        """
+        session = FakeSession(status=429, headers={'Retry-After': '5'})
+
+        with self.assertRaises(LoLException) as cm:
+            self.run_with(session, self.watcher.get_match(1, region='euw'))
+
+        self.assertEqual(cm.exception, error_429)
+        self.assertGreater(self.watcher._blocked_until['euw'], time.time() + 4)
+        self.assertNotIn('na', self.watcher._blocked_until)
+
+    def test_close(self):
+        """
+        Ensure close() closes the session, so a new one is made on next use.
+        """
+        session = FakeSession()
+
+        self.run_with(session, self.watcher.close())
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(self.watcher._session)
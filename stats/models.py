@@ -1,10 +1,39 @@
 import logging
+from datetime import datetime
 
+import pytz
 from django.db import models, transaction
 from django.apps import apps
 
+from utils.db import bulk_insert, column, table
+
 logger = logging.getLogger(__name__)
 
+
+class BucketManager(models.Manager):
+    def ensure_buckets(self, keys):
+        """
+        Accepts an iterable of (version, is_exact_version, region, lane, role) tuples
+        and creates any of the corresponding Buckets that don't exist yet.
+
+        Returns a dict mapping (version, region, lane, role) to Bucket ID.
+        """
+        now = datetime.now(tz=pytz.utc)
+        keys = set(keys)
+
+        bulk_insert(Bucket,
+                    ['version', 'is_exact_version', 'region', 'lane', 'role', 'created_at'],
+                    [key + (now,) for key in keys],
+                    on_conflict='ON CONFLICT (version, region, lane, role) DO NOTHING')
+
+        versions = set(key[0] for key in keys)
+        buckets = self.filter(version__in=versions).values_list('id', 'version', 'region',
+                                                                 'lane', 'role')
+        wanted = set((key[0], key[2], key[3], key[4]) for key in keys)
+
+        return {bucket[1:]: bucket[0] for bucket in buckets if bucket[1:] in wanted}
+
+
 # TODO: Manage least-significant version field, i.e. ability to merge 5.2.0.22, 5.2.0.46, etc
 class Bucket(models.Model):
     """
@@ -21,6 +50,8 @@ class Bucket(models.Model):
     role = models.CharField(max_length=16)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BucketManager()
+
     class Meta:
         unique_together = ('version', 'region', 'lane', 'role')
 
@@ -28,6 +59,164 @@ class Bucket(models.Model):
         return '[{}] V:{} L:{} R:{}'.format(self.region, self.version, self.lane, self.role)
 
 class ChampionStatsManager(models.Manager):
+    @staticmethod
+    def derive_from_sums(stats, fields):
+        """
+        Accepts a dict containing sum_picks, sum_wins and sum_<field> for each of
+        `fields` and adds the win rate and avg_<field> values derived from them.
+
+        Averages are taken over picks, so a stat that Riot omitted from a
+        participant (which it does for zero values) counts as 0.
+        """
+        picks = stats['sum_picks']
+
+        stats['win_rate'] = stats['sum_wins'] / picks * 100 if picks else None
+
+        for field in fields:
+            total = stats['sum_{}'.format(field)]
+            stats['avg_{}'.format(field)] = total / picks if picks and total is not None else None
+
+        return stats
+
+    @staticmethod
+    def _increment_clause(field):
+        """
+        Returns the SET expression used to fold an incoming row into an existing one.
+        Sums are added and everything else is re-derived from the resulting sums.
+        """
+        def total(sum_field):
+            return 'COALESCE({0}.{1}, 0) + COALESCE(EXCLUDED.{1}, 0)'.format(
+                table(ChampionStats), column(ChampionStats, sum_field))
+
+        if field.startswith('sum_'):
+            return total(field)
+        elif field.startswith('avg_'):
+            return '({})::float / NULLIF({}, 0)'.format(total('sum_' + field[4:]),
+                                                        total('sum_picks'))
+        elif field == 'win_rate':
+            return '({}) * 100.0 / NULLIF({}, 0)'.format(total('sum_wins'), total('sum_picks'))
+        else:
+            return 'EXCLUDED.{}'.format(column(ChampionStats, field))
+
+    def bulk_upsert(self, rows, increment=False):
+        """
+        Accepts a list of dicts that each contain bucket_id, champion_id and the
+        same set of ChampionStats fields, and writes all of them using a single
+        INSERT ... ON CONFLICT statement.
+
+        If `increment` is False, existing rows are replaced. Otherwise each row's
+        sum_ fields are added to the existing row's, and its avg_ fields and win
+        rate are re-derived from the new sums.
+
+        Returns the number of rows written.
+        """
+        if not rows:
+            return 0
+
+        # Sorted so that concurrent upserts lock rows in the same order, and can't
+        # deadlock. Stores of matches still wait on each other for the rows they
+        # share (e.g. the 'ALL' buckets'), which are locked until they commit.
+        rows = sorted(rows, key=lambda row: (row['bucket_id'], row['champion_id']))
+        stat_fields = sorted(set(rows[0]) - {'bucket_id', 'champion_id'})
+        fields = ['bucket_id', 'champion_id', 'last_update'] + stat_fields
+        now = datetime.now(tz=pytz.utc)
+
+        if increment:
+            set_clauses = ['{} = {}'.format(column(ChampionStats, f), self._increment_clause(f))
+                           for f in ['last_update'] + stat_fields]
+        else:
+            set_clauses = ['{0} = EXCLUDED.{0}'.format(column(ChampionStats, f))
+                           for f in ['last_update'] + stat_fields]
+
+        on_conflict = 'ON CONFLICT (bucket_id, champion_id) DO UPDATE SET {}'.format(
+            ', '.join(set_clauses))
+
+        written = bulk_insert(ChampionStats, fields,
+                              [[row['bucket_id'], row['champion_id'], now] +
+                               [row[f] for f in stat_fields] for row in rows],
+                              on_conflict=on_conflict)
+
+        logger.info('Upserted %s champion stats rows', written)
+        return written
+
+    def fold_matches(self, match_ids):
+        """
+        Folds the participants of newly stored matches into the running sums of
+        the existing Buckets they fall into, i.e. those for the match's exact version,
+        its major.minor version and 'ALL', each for the match's region and 'ALL'.
+
+        Only Buckets that already exist are maintained, as their sums are known to be
+        complete; seed a new version with Champion.objects.grouped_agg_for_all.
+        Each match must only be folded once, so fold it in the transaction that stores it.
+
+        Returns the number of ChampionStats rows written.
+        """
+        Participant = apps.get_model('matches', 'Participant')
+        Champion = apps.get_model('champions', 'Champion')
+        fields = Champion.aggregable_participant_fields
+
+        # As in Champion.objects.grouped_agg_for_all, champions that aren't stored
+        # yet (e.g. newly released) are left out, as ChampionStats refers to them.
+        participants = list(Participant.objects
+                            .filter(match_detail_id__in=match_ids,
+                                    champion_id__in=Champion.objects.values('champion_id'))
+                            .values('champion_id',
+                                    'winner',
+                                    'match_detail__match_version',
+                                    'match_detail__region',
+                                    'participanttimeline__lane',
+                                    'participanttimeline__role',
+                                    *fields))
+
+        def bucket_versions(version):
+            return version, '.'.join(version.split('.')[:2]), 'ALL'
+
+        versions = set()
+        regions = {'ALL'}
+
+        for p in participants:
+            versions.update(bucket_versions(p['match_detail__match_version']))
+            regions.add(p['match_detail__region'])
+
+        buckets = {bucket[1:]: bucket[0] for bucket in
+                   Bucket.objects.filter(version__in=versions, region__in=regions)
+                                 .values_list('id', 'version', 'region', 'lane', 'role')}
+
+        rows = {}
+
+        for p in participants:
+            lane, role = p['participanttimeline__lane'], p['participanttimeline__role']
+
+            for version in bucket_versions(p['match_detail__match_version']):
+                for region in (p['match_detail__region'], 'ALL'):
+                    bucket_id = buckets.get((version, region, lane, role))
+
+                    if bucket_id is None:
+                        continue
+
+                    key = (bucket_id, p['champion_id'])
+
+                    if key not in rows:
+                        rows[key] = dict({'bucket_id': bucket_id,
+                                          'champion_id': p['champion_id'],
+                                          'sum_picks': 0,
+                                          'sum_wins': 0,
+                                          'sum_losses': 0},
+                                         **{'sum_{}'.format(f): 0 for f in fields})
+
+                    row = rows[key]
+                    row['sum_picks'] += 1
+                    row['sum_wins' if p['winner'] else 'sum_losses'] += 1
+
+                    for f in fields:
+                        row['sum_{}'.format(f)] += p[f] or 0
+
+        rows = [self.derive_from_sums(row, fields) for row in rows.values()]
+
+        logger.debug('Folding %s matches into %s champion stats rows', len(match_ids), len(rows))
+
+        return self.bulk_upsert(rows, increment=True)
+
     # TODO: Compare perf w/postgres 9.5 UPSERT (not used by Django yet)
     def upsert(self, lane, role, version, is_exact_version, region, champion, update_fields):
         """
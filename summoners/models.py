@@ -3,8 +3,9 @@ from datetime import timedelta, datetime
 
 import pytz
 from django.apps import apps
-from django.db import models, transaction
+from django.db import connection, models, transaction
 
+from utils.db import column, table, values_sql
 from utils.functions import standardize_name
 
 logger = logging.getLogger(__name__)
@@ -32,8 +33,6 @@ class SummonerManager(models.Manager):
                            region=region.upper())
 
     def create_or_update_summoner_from_match(self, region, attrs):
-        # TODO: Define ttl constant elsewhere.
-        summoner_ttl = timedelta(days=7)
         summoner_id = attrs['summonerId']
         region = region.upper()
 
@@ -41,13 +40,84 @@ class SummonerManager(models.Manager):
             if self.is_known(summoner_id, region):
                 summoner = Summoner.objects.get(summoner_id=summoner_id, region=region)
 
-                if summoner.last_update < datetime.now(tz=pytz.utc) - summoner_ttl:
+                if summoner.last_update < datetime.now(tz=pytz.utc) - Summoner.FROM_MATCH_TTL:
                     summoner.update_from_match(attrs)
             else:
                 summoner = self.create_summoner_from_match(region, attrs)
 
         return summoner
 
+    def bulk_create_or_update_summoners_from_match(self, players):
+        """
+        Accepts a list of (region, attrs) tuples, where attrs is the `player` dict of
+        a participant identity, and creates or updates all of the summoners with a
+        single INSERT ... ON CONFLICT statement.
+
+        As with create_or_update_summoner_from_match, existing summoners are only
+        updated if they haven't been updated within Summoner.FROM_MATCH_TTL. The
+        summoners that aren't updated are read by a second query, which also finds
+        those inserted by concurrent transactions while the upsert ran.
+
+        Returns a dict of {(summoner_id, region): pk}, with regions uppercased.
+        """
+        unique_players = {}
+
+        for region, attrs in players:
+            unique_players[(attrs['summonerId'], region.upper())] = attrs
+
+        if not unique_players:
+            return {}
+
+        # Sorted so that concurrent upserts lock rows in the same order.
+        values, params = values_sql(
+            [(summoner_id, region, attrs['summonerName'],
+              standardize_name(attrs['summonerName']), attrs['profileIcon'])
+             for (summoner_id, region), attrs in sorted(unique_players.items())])
+        now = datetime.now(tz=pytz.utc)
+        columns = {f: column(Summoner, f) for f in ['id', 'summoner_id', 'region', 'name',
+                                                    'std_name', 'profile_icon_id',
+                                                    'last_update']}
+        upsert_sql = '''
+            WITH input (summoner_id, region, name, std_name, profile_icon_id) AS (
+                VALUES {values}
+            )
+            INSERT INTO {table} ({summoner_id}, {region}, {name}, {std_name},
+                                 {profile_icon_id}, {last_update})
+            SELECT summoner_id, region, name, std_name, profile_icon_id, %s FROM input
+            ON CONFLICT ({summoner_id}, {region}) DO UPDATE
+            SET {name} = EXCLUDED.{name},
+                {std_name} = EXCLUDED.{std_name},
+                {profile_icon_id} = EXCLUDED.{profile_icon_id},
+                {last_update} = EXCLUDED.{last_update}
+            WHERE {table}.{last_update} < %s
+            RETURNING {id}, {summoner_id}, {region}
+        '''.format(values=values, table=table(Summoner), **columns)
+
+        with connection.cursor() as cursor:
+            cursor.execute(upsert_sql, params + [now, now - Summoner.FROM_MATCH_TTL])
+            summoners = {(summoner_id, region): pk
+                         for pk, summoner_id, region in cursor.fetchall()}
+
+            # Summoners that were updated recently aren't returned by the upsert, so
+            # they are read by another statement. That one also sees any summoner that
+            # a concurrent transaction inserted and committed while the upsert waited
+            # on it, which the upsert's own snapshot doesn't (under READ COMMITTED).
+            missing = [key for key in sorted(unique_players) if key not in summoners]
+
+            if missing:
+                missing_values, missing_params = values_sql(missing)
+                select_sql = '''
+                    SELECT {id}, {summoner_id}, {region} FROM {table}
+                    WHERE ({summoner_id}, {region}) IN (VALUES {values})
+                '''.format(values=missing_values, table=table(Summoner), **columns)
+
+                cursor.execute(select_sql, missing_params)
+                summoners.update(((summoner_id, region), pk)
+                                 for pk, summoner_id, region in cursor.fetchall())
+
+        logger.debug('Upserted {} summoners from match data'.format(len(summoners)))
+        return summoners
+
     def is_known(self, summoner_id, region):
         return self.filter(summoner_id=summoner_id, region=region).exists()
 
@@ -64,6 +134,7 @@ class Summoner(models.Model):
     MATCHES_TTL = timedelta(minutes=1)
     LEAGUES_TTL = timedelta(minutes=1)
     USER_REFRESH_TTL = timedelta(minutes=20)    # Cooldown between user-initiated refreshes
+    FROM_MATCH_TTL = timedelta(days=7)          # Min time between updates from match data
 
     summoner_id = models.BigIntegerField(db_index=True)
 
@@ -139,9 +210,9 @@ class Summoner(models.Model):
         Returns a datetime representation of this summoner's most recently played match that
         is stored, or None if no matches are stored for this summoner.
         """
-        match_model = apps.get_model('matches.MatchDetail')
-        match_date = match_model.objects\
-            .filter(participantidentity__summoner__id=self.id)\
+        summoner_match = apps.get_model('matches.SummonerMatch')
+        match_date = summoner_match.objects\
+            .filter(summoner_id=self.id)\
             .values_list('match_creation', flat=True)\
             .order_by('-match_creation')\
             .first()
@@ -158,12 +229,12 @@ class Summoner(models.Model):
         Accepts a limit on the number of matches returned. Setting `limit` to False will return all matches.
         """
         match_detail = apps.get_model('matches', 'MatchDetail')
-        pi_set = self.participantidentity_set.all()
+        matches = match_detail.objects.for_summoner(self.id)
 
         if limit:
-            return match_detail.objects.filter(participantidentity=pi_set).order_by('match_creation').reverse()[:limit]
+            return matches[:limit]
         else:
-            return match_detail.objects.filter(participantidentity=pi_set).order_by('match_creation').reverse()
+            return matches
 
     def league(self):
         """
@@ -244,4 +244,60 @@ class SummonerTestCase(TestCase):
 
         complete_summoner = Summoner.objects.get(name='Ronfar')
 
-        self.assertTrue(complete_summoner.is_complete())
\ No newline at end of file
+        self.assertTrue(complete_summoner.is_complete())
+
+    def test_bulk_create_or_update_from_match(self):
+        """
+        Ensure bulk_create_or_update creates new summoners, only updates existing ones
+        once their TTL has passed and returns the PKs of all of them.
+        """
+        Summoner.objects.create_or_update_summoner_from_match('na', self.attrs_from_match)
+        existing = Summoner.objects.get(name='hasahaya')
+
+        renamed_attrs_from_match = self.attrs_from_match.copy()
+        renamed_attrs_from_match['summonerName'] = 'Another Name'
+        new_attrs_from_match = {'profileIcon': 7,
+                                'summonerId': 22222,
+                                'summonerName': 'Some Name'}
+
+        summoners = Summoner.objects.bulk_create_or_update_summoners_from_match(
+            [('na', renamed_attrs_from_match),
+             ('na', new_attrs_from_match),
+             ('na', new_attrs_from_match)])
+
+        self.assertEqual(Summoner.objects.count(), 2)
+        self.assertEqual(summoners[(43116448, 'NA')], existing.id)
+        self.assertEqual(summoners[(22222, 'NA')],
+                         Summoner.objects.get(std_name='somename').id)
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, 'hasahaya')
+
+        with freeze_time(datetime.now(tz=pytz.utc) + timedelta(days=7)):
+            Summoner.objects.bulk_create_or_update_summoners_from_match(
+                [('na', renamed_attrs_from_match)])
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, 'Another Name')
+        self.assertEqual(Summoner.objects.count(), 2)
+
+    def test_bulk_create_or_update_returns_fresh_summoners(self):
+        """
+        Ensure bulk_create_or_update returns the PKs of existing summoners that were
+        updated within their TTL, without updating them.
+        """
+        Summoner.objects.create_or_update_summoner_from_match('na', self.attrs_from_match)
+        existing = Summoner.objects.get(name='hasahaya')
+
+        renamed_attrs_from_match = self.attrs_from_match.copy()
+        renamed_attrs_from_match['summonerName'] = 'Another Name'
+
+        summoners = Summoner.objects.bulk_create_or_update_summoners_from_match(
+            [('na', renamed_attrs_from_match)])
+
+        self.assertEqual(summoners, {(43116448, 'NA'): existing.id})
+
+        last_update = existing.last_update
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, 'hasahaya')
+        self.assertEqual(existing.last_update, last_update)
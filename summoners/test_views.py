@@ -0,0 +1,31 @@
+import json
+
+from django.test import TestCase
+
+from .models import Summoner
+
+
+class SummonerViewSetTestCase(TestCase):
+    def setUp(self):
+        for summoner_id in range(1, 4):
+            Summoner.objects.create(summoner_id=summoner_id, name='Summoner {}'.format(summoner_id),
+                                    std_name='summoner{}'.format(summoner_id), region='NA',
+                                    profile_icon_id=1)
+
+    def test_cursor_pagination(self):
+        """
+        Ensure summoners are paginated newest first, honoring page_size, and that
+        refreshing a summoner doesn't move it between pages.
+        """
+        first_page = json.loads(self.client.get('/summoners/', {'page_size': 2}).content.decode())
+
+        self.assertEqual([s['summoner_id'] for s in first_page['results']], [3, 2])
+        self.assertIsNone(first_page['previous'])
+
+        Summoner.objects.get(summoner_id=1).save()
+        Summoner.objects.get(summoner_id=3).save()
+
+        second_page = json.loads(self.client.get(first_page['next']).content.decode())
+
+        self.assertEqual([s['summoner_id'] for s in second_page['results']], [1])
+        self.assertIsNone(second_page['next'])
@@ -5,13 +5,13 @@ from django.shortcuts import render, redirect
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.http import JsonResponse, HttpResponseBadRequest
 from rest_framework import viewsets
-from rest_framework.pagination import PageNumberPagination
 
 from .models import Summoner
 from .serializers import SummonerSerializer
 from .forms import SearchForm
 from cache.summoners import SingleSummoner
 from utils.functions import standardize_name
+from utils.pagination import CursorPagination
 from utils.constants import REGIONS
 
 logger = logging.getLogger(__name__)
@@ -19,10 +19,17 @@ logger = logging.getLogger(__name__)
 SUMMONER_NOT_FOUND_PK = -1
 
 
-class SummonerResultsSetPagination(PageNumberPagination):
+class SummonerResultsSetPagination(CursorPagination):
+    """
+    Paginates summoners newest first by primary key, so a page is found through
+    its index instead of by skipping every earlier row. last_update isn't used as
+    it changes on every refresh, which would make summoners skip or repeat
+    between pages.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = '-id'
 
 
 class SummonerViewSet(viewsets.ReadOnlyModelViewSet):
@@ -82,24 +89,27 @@ def get_pk_from_region_and_summoner(request):
 def show(request, name, region):
     ss = SingleSummoner(name=name, region=region)
 
+    # Known summoners' pages are usually served from the cache alone.
+    page = ss.page_data()
+
+    if page is not None:
+        return render(request, 'summoners/show.html',
+                      {'summoner': page['summoner'],
+                       'name': page['summoner']['name'],
+                       'league_entry': page['league_entry'],
+                       'recent_matches': page['recent_matches']})
+
     if ss.is_invalid_query():
         logger.info('Temporarily blacklisted query detected: [%s] %s', ss.region, ss.std_name)
         return render(request, 'summoners/not_found.html')
-
-    if ss.is_known():
-        ss.get_instance()
-        return render(request, 'summoners/show.html',
-                      {'summoner': ss.summoner,
-                       'name': ss.summoner.name,
-                       'recent_matches': ss.summoner.matches(10)})
     else:
-        if ss.first_time_query():
-            return render(request, 'summoners/show.html',
-                          {'summoner': ss.summoner,
-                           'name': ss.summoner.name,
-                           'recent_matches': ss.summoner.matches(10)})
-        else:
-            return render(request, 'summoners/not_found.html')
+        # Render the page right away and let it wait on the lookup, see task_status.
+        # Once it's done, the page reloads and is either shown as known or not found.
+        task_ids = ss.start_first_time_query()
+        return render(request, 'summoners/show.html',
+                      {'summoner': None,
+                       'name': name,
+                       'task_ids': json.dumps(task_ids)})
 
 
 def refresh(request):
@@ -4,7 +4,7 @@ from .functions import chunks
 from leagues.models import LeagueEntry
 from summoners.models import Summoner
 from riot_api.wrapper import RiotAPI
-from lol_stats2.celery import riot_api
+from lol_stats2.celery import rate_limiter
 
 _MAX_SUMMONER_IDS_PER_QUERY = 40
 
@@ -14,7 +14,7 @@ _MAX_SUMMONER_IDS_PER_QUERY = 40
 
 
 def remote_call_duration():
-    return float(riot_api.rate_limit[:-2]) ** -1
+    return rate_limiter.min_interval()
 
 
 def get_league_if_none(summoners=None):
@@ -0,0 +1,112 @@
+"""
+Helpers for set-based statements the ORM can't express (as of Django 1.8),
+e.g. multi-row INSERTs with RETURNING or ON CONFLICT clauses.
+
+ON CONFLICT requires Postgres 9.5+.
+"""
+
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def column(model, field_name):
+    """
+    Returns the quoted column name of a model field.
+    Accepts either the field's name or its attname (e.g. `bucket_id`).
+    """
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+
+def values_sql(rows):
+    """
+    Returns a 2-tuple of an SQL VALUES list for `rows` (an iterable of equal-length
+    sequences) and a flat list of the parameters it refers to.
+    """
+    placeholders = []
+    params = []
+
+    for row in rows:
+        placeholders.append('({})'.format(', '.join(['%s'] * len(row))))
+        params.extend(row)
+
+    return ', '.join(placeholders), params
+
+
+def bulk_insert(model, fields, rows, on_conflict='', returning=None):
+    """
+    Inserts `rows` into the table of `model` with a single statement.
+
+    `fields` is a list of field names (or attnames) that each row provides values for,
+    in order. `on_conflict` is an optional raw ON CONFLICT clause.
+    `returning` is an optional list of field names to return for each inserted row.
+
+    Returns a list of tuples if `returning` is given, otherwise the number of rows affected.
+    """
+    rows = list(rows)
+
+    if not rows:
+        return [] if returning else 0
+
+    values, params = values_sql(rows)
+    sql = 'INSERT INTO {} ({}) VALUES {} {}'.format(
+        table(model),
+        ', '.join(column(model, f) for f in fields),
+        values,
+        on_conflict)
+
+    if returning:
+        sql += ' RETURNING {}'.format(', '.join(column(model, f) for f in returning))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+        if returning:
+            return cursor.fetchall()
+        else:
+            return cursor.rowcount
+
+
+def bulk_update(model, fields, rows):
+    """
+    Updates many rows of the table of `model` with a single UPDATE ... FROM (VALUES ...)
+    statement.
+
+    `fields` is a list of field names (or attnames) and `rows` is an iterable of
+    sequences whose first item is the primary key of the row to update, followed by
+    the new values of `fields`, in order.
+
+    Returns the number of rows affected.
+    """
+    rows = list(rows)
+
+    if not rows:
+        return 0
+
+    pk = model._meta.pk
+    all_fields = [pk] + [model._meta.get_field(f) for f in fields]
+    aliases = ['c{}'.format(i) for i in range(len(all_fields))]
+    values, params = values_sql(rows)
+
+    # Values are cast explicitly since e.g. a column of NULLs has no type in VALUES.
+    assignments = ', '.join('{} = v.{}::{}'.format(connection.ops.quote_name(f.column),
+                                                   alias, f.db_type(connection))
+                            for f, alias in zip(all_fields[1:], aliases[1:]))
+    sql = 'UPDATE {table} SET {assignments} FROM (VALUES {values}) AS v ({aliases}) ' \
+          'WHERE {table}.{pk} = v.{pk_alias}'.format(
+              table=table(model),
+              assignments=assignments,
+              values=values,
+              aliases=', '.join(aliases),
+              pk=connection.ops.quote_name(pk.column),
+              pk_alias=aliases[0])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
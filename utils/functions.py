@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 
 import inflection
 from django.apps import apps
@@ -40,6 +41,33 @@ def non_dict_or_list_keys(dct):
             yield k
 
 
+# Riot's DTOs use a small, fixed set of keys, so this comfortably holds all of them.
+_UNDERSCORE_KEY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=_UNDERSCORE_KEY_CACHE_SIZE)
+def underscore_key(key):
+    """
+    Returns key (e.g. 'totalDamageDealt') in snake_case (e.g. 'total_damage_dealt').
+
+    Results are memoized, see underscore_key_stats.
+    """
+    return inflection.underscore(key)
+
+
+def underscore_key_stats():
+    """
+    Returns a dict of the hits, misses, size and hit rate of underscore_key's cache.
+    """
+    info = underscore_key.cache_info()
+    lookups = info.hits + info.misses
+
+    return {'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'hit_rate': info.hits / lookups if lookups else None}
+
+
 def underscore_dict(dct):
     """
     Returns a copy of dct with top-level keys in camel_case.
@@ -47,7 +75,7 @@ def underscore_dict(dct):
     under_dict = {}
 
     for k in dct:
-        under_dict[inflection.underscore(k)] = dct[k]
+        under_dict[underscore_key(k)] = dct[k]
 
     return under_dict
 
@@ -65,6 +93,23 @@ def multi_task_status(task_ids):
         return False
 
 
+def follow_up_task_ids(task_ids):
+    """
+    Returns the IDs of tasks that the given tasks started and reported in their result,
+    under a 'task_ids' key (see cache.summoners.finish_first_time_query).
+    These are what a client waiting on the given tasks should wait on next.
+    """
+    follow_ups = []
+
+    for task_id in task_ids:
+        result = AsyncResult(task_id)
+
+        if result.successful() and isinstance(result.result, dict):
+            follow_ups.extend(result.result.get('task_ids', []))
+
+    return follow_ups
+
+
 def group_status(group_id, result_ids):
     results = [AsyncResult(r_id) for r_id in result_ids]
     gr = GroupResult(id, results)
@@ -1,6 +1,7 @@
 from django.db.models.fields import AutoField, related
 
-from utils.functions import underscore_dict, get_val_or_none
+from utils.functions import get_val_or_none, underscore_key
+
 
 class IterableDataFieldsMixin(object):
     """
@@ -19,6 +20,66 @@ class IterableDataFieldsMixin(object):
             if type(field) is not AutoField and type(field) is not related.ForeignKey:
                 yield field.name
 
+
+class FieldPlan(object):
+    """
+    Maps the keys of Riot's DTOs (in camelCase) to a set of model fields.
+
+    Each key is converted the first time it is seen and the result (its field, or
+    None if it isn't one of the fields) is remembered, so mapping a DTO is one
+    dict lookup per key.
+    """
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.field_set = frozenset(self.fields)
+        self.key_to_field = {}
+
+    def field_for(self, key):
+        try:
+            return self.key_to_field[key]
+        except KeyError:
+            field = underscore_key(key)
+
+            if field not in self.field_set:
+                field = None
+
+            self.key_to_field[key] = field
+            return field
+
+    def map(self, attrs):
+        """
+        Returns a dict of the values in attrs that belong to the plan's fields,
+        keyed by field name.
+        """
+        dct = {}
+
+        for key, value in attrs.items():
+            field = self.field_for(key)
+
+            if field is not None:
+                dct[field] = value
+
+        return dct
+
+
+# Plans are keyed by model class and a name for the set of fields they map to.
+_plans = {}
+
+
+def field_plan(model, name, get_fields):
+    """
+    Returns the FieldPlan named `name` for `model`, creating it on first use
+    from the field names returned by `get_fields`.
+    """
+    key = (model, name)
+    plan = _plans.get(key)
+
+    if plan is None:
+        plan = _plans[key] = FieldPlan(get_fields())
+
+    return plan
+
+
 class CreateableFromAttrsMixin(object):
     """
     Mixin for model manager classes.
@@ -29,68 +90,60 @@ class CreateableFromAttrsMixin(object):
         initialization dict that contains just the fields and values that are relevant
         to this model.
         """
-        model_fields = [f for f in self.model.data_fields()]
-        underscore_kwargs = underscore_dict(kwargs)
-        dct = {}
+        plan = field_plan(self.model, 'data', self.model.data_fields)
+        dct = plan.map(kwargs)
 
-        for field in model_fields:
-            dct[field] = underscore_kwargs[field]
+        # Every field is required.
+        if len(dct) != len(plan.fields):
+            for field in plan.fields:
+                if field not in dct:
+                    raise KeyError(field)
 
         return dct
 
+
 class ParticipantFromAttrsMixin(object):
     """
     A mixin for the Participant model manager to handle the merging of
     Riot's ParticipantStats DTO's fields into Participant.
     """
+    # The fields that Riot sends as part of the Participant DTO,
+    # as opposed to the ParticipantStats DTO.
+    native_field_names = ['champion_id',
+                          'highest_achieved_season_tier',
+                          'participant_id',
+                          'spell1_id',
+                          'spell2_id',
+                          'team_id']
+
     def init_dict(self, attrs):
         """
         Return an initialization dict that contains just the key-value
         pairs that are relevant to the Participant model.
         """
-        # The fields that Riot sends as part of the Participant DTO,
-        # as opposed to the ParticipantStats DTO.
-        native_field_names = ['champion_id',
-                              'highest_achieved_season_tier',
-                              'participant_id',
-                              'spell1_id',
-                              'spell2_id',
-                              'team_id']
-
-        # We construct sets of field names to determine which fields come from
-        # which DTO via set differences (there are a lot of fields in
-        # ParticipantStats and it can easily change).
-        native_fields_set = set(native_field_names)
-
-        model_fields = [f for f in self.model.data_fields()]
-        all_fields_set = set(model_fields)
-
-        # ParticipantStats will always contain whatever isn't in Participant.
-        stats_fields = all_fields_set - native_fields_set
+        native_plan = field_plan(self.model, 'native', lambda: self.native_field_names)
 
-        underscore_attrs = underscore_dict(attrs)
+        # ParticipantStats will always contain whatever isn't in Participant
+        # (there are a lot of fields in ParticipantStats and it can easily change).
+        stats_plan = field_plan(self.model, 'stats',
+                                lambda: [f for f in self.model.data_fields()
+                                         if f not in native_plan.field_set])
 
         # We will be populating `dct` with the total fields required to
         # init the Participant instance.
-        dct = {}
-
         # First, set the fields that come from the Participant DTO.
-        for k in native_field_names:
-            dct[k] = underscore_attrs[k]
+        native_attrs = native_plan.map(attrs)
+        dct = {k: native_attrs[k] for k in self.native_field_names}
 
         # Participant also contains fields from Riot's ParticipantStats DTO
         # (we store both DTOs' fields in a single model - Participant),
         # so here we get the ParticipantStats fields and insert them into
         # the top level of the returned dict.
-        valid_stats_dct = {}
-        stats_attrs = underscore_dict(attrs['stats'])
+        stats_attrs = stats_plan.map(attrs['stats'])
 
-        # We can't just use the underscore converted attrs['stats'] b/c Riot
-        # omits fields that would be empty/0/null, so we replace empty fields
+        # Riot omits fields that would be empty/0/null, so we replace empty fields
         # with None.
-        for k in stats_fields:
-            valid_stats_dct[k] = get_val_or_none(stats_attrs, k)
+        for k in stats_plan.fields:
+            dct[k] = get_val_or_none(stats_attrs, k)
 
-        dct.update(valid_stats_dct)
-
-        return dct
\ No newline at end of file
+        return dct
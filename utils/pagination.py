@@ -0,0 +1,30 @@
+"""
+Pagination classes shared by the API's views.
+"""
+
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    CursorPagination that honors `page_size_query_param` and `max_page_size`,
+    like PageNumberPagination does (DRF 3.3's CursorPagination ignores them).
+
+    Note that DRF 3.3 builds a cursor's position from the first field of `ordering`
+    only; rows that tie on it are skipped by offset from that position.
+    """
+    page_size_query_param = None
+    max_page_size = None
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return pagination._positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
@@ -0,0 +1,22 @@
+"""
+Shared access to the Redis instance that also serves as Celery's result backend.
+"""
+
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """
+    Returns a StrictRedis client for settings.REDIS_URL, creating it on first use.
+
+    The client's connection pool is shared by everything in the process.
+    """
+    global _client
+
+    if _client is None:
+        _client = redis.StrictRedis.from_url(settings.REDIS_URL)
+
+    return _client
@@ -0,0 +1,47 @@
+"""
+Renderer classes shared by the API's views.
+"""
+
+import re
+import uuid
+from collections import OrderedDict
+
+from rest_framework import renderers
+
+
+class RawJSON(str):
+    """
+    A string of JSON that has already been rendered, which RawJSONRenderer outputs
+    as is instead of as a string.
+    """
+
+
+class RawJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that splices the RawJSON values found in the data (directly, or in
+    lists and dicts) into its output, so stored JSON can be served without parsing
+    and rendering it again.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        raw = []
+        token = uuid.uuid4().hex
+
+        def replace(value):
+            if isinstance(value, RawJSON):
+                raw.append(value)
+                return 'raw-json:{}:{}'.format(token, len(raw) - 1)
+            elif isinstance(value, dict):
+                return OrderedDict((k, replace(v)) for k, v in value.items())
+            elif isinstance(value, list):
+                return [replace(v) for v in value]
+            else:
+                return value
+
+        rendered = super().render(replace(data), accepted_media_type, renderer_context)
+
+        if raw:
+            rendered = re.sub('"raw-json:{}:([0-9]+)"'.format(token),
+                              lambda match: raw[int(match.group(1))],
+                              rendered.decode()).encode()
+
+        return rendered
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from .functions import underscore_dict, underscore_key, underscore_key_stats
+
+
+class UnderscoreKeyTestCase(SimpleTestCase):
+    def setUp(self):
+        underscore_key.cache_clear()
+
+    def test_underscore_dict(self):
+        """
+        Ensure top-level keys are converted to snake_case.
+        """
+        self.assertEqual(underscore_dict({'totalDamageDealt': 1, 'wins': 2, 'miniSeries': {'target': 3}}),
+                         {'total_damage_dealt': 1, 'wins': 2, 'mini_series': {'target': 3}})
+
+    def test_keys_converted_once(self):
+        """
+        Ensure each key is only converted once, and repeats are counted as hits.
+        """
+        underscore_dict({'playerOrTeamId': '1', 'leaguePoints': 10})
+        underscore_dict({'playerOrTeamId': '2', 'leaguePoints': 20})
+
+        self.assertEqual(underscore_key_stats(), {'hits': 2,
+                                                  'misses': 2,
+                                                  'size': 2,
+                                                  'hit_rate': 0.5})
+
+    def test_stats_without_lookups(self):
+        """
+        Ensure the hit rate is None before any key is converted.
+        """
+        self.assertIsNone(underscore_key_stats()['hit_rate'])
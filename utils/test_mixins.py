@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from matches.models import Participant
+from . import mixins
+from .mixins import FieldPlan, field_plan
+
+
+class FieldPlanTestCase(SimpleTestCase):
+    def test_map(self):
+        """
+        Ensure only the keys of the plan's fields are mapped, and each key is only
+        converted once.
+        """
+        plan = FieldPlan(['champion_id', 'team_id'])
+
+        self.assertEqual(plan.map({'championId': 1, 'teamId': 100, 'lane': 'MID'}),
+                         {'champion_id': 1, 'team_id': 100})
+        self.assertEqual(plan.key_to_field, {'championId': 'champion_id',
+                                             'teamId': 'team_id',
+                                             'lane': None})
+
+    def test_field_plan_built_once(self):
+        """
+        Ensure a plan is built once per model and name.
+        """
+        calls = []
+
+        def get_fields():
+            calls.append(1)
+            return ['champion_id']
+
+        for name in ('test', 'other-test'):
+            self.addCleanup(mixins._plans.pop, (Participant, name), None)
+
+        plan = field_plan(Participant, 'test', get_fields)
+
+        self.assertIs(field_plan(Participant, 'test', get_fields), plan)
+        self.assertIsNot(field_plan(Participant, 'other-test', get_fields), plan)
+        self.assertEqual(len(calls), 2)
+
+    def test_participant_init_dict(self):
+        """
+        Ensure a Participant's init dict has every data field, with the stats that
+        Riot left out set to None.
+        """
+        attrs = {'championId': 154,
+                 'highestAchievedSeasonTier': 'GOLD',
+                 'participantId': 1,
+                 'spell1Id': 4,
+                 'spell2Id': 11,
+                 'teamId': 100,
+                 'masteries': [],
+                 'stats': {'kills': 3, 'champLevel': 16, 'winner': True}}
+
+        dct = Participant.objects.init_dict(attrs)
+
+        self.assertEqual(set(dct), set(Participant.data_fields()))
+        self.assertEqual(dct['champion_id'], 154)
+        self.assertEqual(dct['kills'], 3)
+        self.assertEqual(dct['champ_level'], 16)
+        self.assertIsNone(dct['deaths'])
@@ -0,0 +1,24 @@
+"""
+Mixins shared by the test cases of several apps.
+"""
+
+from utils.redis_client import get_redis
+
+
+class RedisTestMixin(object):
+    """
+    Mixin for test cases of objects that keep their state in Redis.
+
+    Sets `self.redis` to the Redis connection and deletes every key under
+    `redis_prefix` after each test, so objects under test should be given that prefix.
+    """
+    redis_prefix = None
+
+    def setUp(self):
+        super().setUp()
+        self.redis = get_redis()
+        self.addCleanup(self.delete_redis_keys)
+
+    def delete_redis_keys(self):
+        for key in self.redis.scan_iter('{}:*'.format(self.redis_prefix)):
+            self.redis.delete(key)
@@ -4,6 +4,12 @@ celery multi restart default -A lol_stats2 -l INFO -Q default -c 10 --autoreload
 celery multi restart match_ids -A lol_stats2 -l INFO -Q match_ids -c 10 --autoreload --logfile=log/%N.log --pidfile=%N.pid
 celery multi restart store -A lol_stats2 -l INFO -Q store -c 10 --autoreload --logfile=log/%N.log --pidfile=%N.pid
 
+# One worker per crawled region and priority for Riot API calls, see riot_api/routing.py.
+for region in na euw; do
+    celery multi restart riot_api.$region -A lol_stats2 -l INFO -Q riot_api.$region -c 10 -Ofair --autoreload --logfile=log/%N.log --pidfile=%N.pid
+    celery multi restart riot_api.$region.interactive -A lol_stats2 -l INFO -Q riot_api.$region.interactive -c 4 -Ofair --autoreload --logfile=log/%N.log --pidfile=%N.pid
+done
+
 # Tail all logs using django color scheme.
 # multitail -s 4 -cS django log/default.log -cS django log/match_ids.log -cS django log/store.log -cS django log/debug.log
 
@@ -3,3 +3,9 @@
 celery multi stop default --logfile=log/%N.log --pidfile=%N.pid
 celery multi stop match_ids --logfile=log/%N.log --pidfile=%N.pid
 celery multi stop store --logfile=log/%N.log --pidfile=%N.pid
+
+# Riot API workers, see workers_restart.sh.
+for region in na euw; do
+    celery multi stop riot_api.$region --logfile=log/%N.log --pidfile=%N.pid
+    celery multi stop riot_api.$region.interactive --logfile=log/%N.log --pidfile=%N.pid
+done